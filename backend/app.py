@@ -1,52 +1,280 @@
 # ADD THIS AT THE TOP OF app.py (after other imports)
 from bson import ObjectId
-from datetime import datetime
-import json
-
-# ADD THIS CLASS ANYWHERE BEFORE app = Flask(__name__)
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        if isinstance(o, datetime):
-            return o.isoformat()
-        return super().default(o)
+from pymongo import ReturnDocument, UpdateOne
 
 import os
 from db import db  # Add this if not already there
 from flask_cors import CORS
-from flask import Flask, jsonify, request
-from enhanced_models import adaptive_forecast_arima, adaptive_forecast_lstm, adaptive_ensemble_forecast
+from flask import Flask, jsonify, request, Response, stream_with_context
+from flask.json.provider import JSONProvider
 from db import get_instruments, get_historical_data, store_historical_data, store_forecasts
 from utils import fetch_data_from_yfinance
-from enhanced_adaptive_learning import enhanced_adaptive_manager
-from continuous_monitoring import monitoring_system
+import orjson
+import requests as http_requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from functools import lru_cache
+from apscheduler.schedulers.background import BackgroundScheduler
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import logging
 import yfinance as yf
 import traceback
 import time
+import pickle
+import hashlib
+import queue
 import threading
-import logging
-
-# In app.py, add this after the imports and before the routes
-import os
-
-
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+class ORJSONProvider(JSONProvider):
+    """Serialize responses through orjson instead of the stdlib encoder."""
+
+    @staticmethod
+    def _default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+# The adaptive-learning stack drags in TensorFlow/statsmodels/Numba; import
+# it on first use so /health and /instruments don't pay the cold-start tax
+_eam = None
+_cms = None
+
+def _adaptive_manager():
+    global _eam
+    if _eam is None:
+        from enhanced_adaptive_learning import enhanced_adaptive_manager
+        _eam = enhanced_adaptive_manager
+    return _eam
+
+def _monitoring_system():
+    global _cms
+    if _cms is None:
+        from continuous_monitoring import monitoring_system
+        _cms = monitoring_system
+    return _cms
+
+# Shared pool for yfinance I/O and adaptive-learning triggers so
+# independent work overlaps instead of running serially per request
+executor = ThreadPoolExecutor(max_workers=8)
+
+# Short-TTL cache in front of yfinance so bursts of identical requests
+# skip the HTTP round-trip entirely
+CACHE_TTL = int(os.getenv('CACHE_TTL', 120))
+
+try:
+    import redis
+    _redis = redis.Redis(connection_pool=redis.ConnectionPool.from_url(
+        os.getenv('REDIS_URL', 'redis://localhost:6379/0'), max_connections=32))
+    _redis.ping()
+    logger.info("✅ Redis cache connected")
+except Exception as cache_error:
+    _redis = None
+    logger.warning(f"⚠️ Redis unavailable, using in-process history cache: {cache_error}")
+
+_history_cache = {}
+_history_lock = threading.Lock()
+
+# One shared HTTP session with a sized connection pool so repeated
+# yfinance calls reuse TCP/TLS connections, and one Ticker per symbol
+_session = http_requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=32, pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[429, 500, 502, 503, 504])
+))
+
+@lru_cache(maxsize=512)
+def _ticker(symbol):
+    return yf.Ticker(symbol, session=_session)
+
+# Symbol normalization memoized per raw input: one pass for the clean
+# form and one translate for the yfinance spelling
+_XLATE = str.maketrans('/', '-')
+
+@lru_cache(maxsize=1024)
+def _norm(sym):
+    s = sym.upper().strip()
+    return s, s.translate(_XLATE)
+
+def cached_history(symbol, start=None, end=None, interval='1d', period=None):
+    """Fetch Ticker.history through a short-TTL cache (Redis when available)."""
+    key = f"yfh:{symbol}:{start.date() if start else ''}:{end.date() if end else ''}:{interval}:{period or ''}"
+    if _redis is not None:
+        try:
+            cached = _redis.get(key)
+            if cached is not None:
+                return pickle.loads(cached)
+        except Exception as e:
+            logger.warning(f"⚠️ Redis read failed: {e}")
+    else:
+        with _history_lock:
+            hit = _history_cache.get(key)
+        if hit and time.time() - hit[0] < CACHE_TTL:
+            return hit[1]
+
+    ticker = _ticker(symbol)
+    if period:
+        df = ticker.history(period=period, interval=interval)
+    else:
+        df = ticker.history(start=start, end=end, interval=interval)
+
+    if not df.empty:
+        if _redis is not None:
+            try:
+                _redis.setex(key, CACHE_TTL, pickle.dumps(df))
+            except Exception as e:
+                logger.warning(f"⚠️ Redis write failed: {e}")
+        else:
+            with _history_lock:
+                _history_cache[key] = (time.time(), df)
+                # Bound the cache so long-running workers don't hoard frames
+                if len(_history_cache) > 512:
+                    oldest = min(_history_cache, key=lambda k: _history_cache[k][0])
+                    _history_cache.pop(oldest, None)
+    return df
+
+# Adaptive-learning work runs out-of-band so /historical-data answers as
+# soon as the fetch completes instead of waiting on a training pipeline.
+# A per-symbol timestamp map de-duplicates bursts of dashboard refreshes.
+training_queue = queue.Queue()
+_last_enqueued = {}
+_TRAINING_DEDUP_SECONDS = 300
+
+def _run_adaptive_triggers(symbol_clean, price_series):
+    """Run the four adaptive-learning triggers for one symbol."""
+
+    # 1. INCREMENTAL UPDATE TRIGGER
+    def run_incremental_update():
+        latest_model = _adaptive_manager().get_latest_model_info(symbol_clean, 'lstm')
+        if not latest_model:
+            return
+        # Use recent data for incremental learning (last 5-7 days)
+        recent_data = price_series.tail(7)
+        if len(recent_data) >= 5:
+            logger.info(f"🔄 Triggering incremental LSTM update for {symbol_clean}")
+            try:
+                new_version = _adaptive_manager().incremental_lstm_update(
+                    symbol_clean, recent_data, latest_model['version_id']
+                )
+                if new_version:
+                    logger.info(f"✅ Incremental update successful: {new_version}")
+                else:
+                    logger.warning("⚠️ Incremental update returned no new version")
+            except Exception as inc_error:
+                logger.warning(f"⚠️ Incremental update failed: {inc_error}")
+
+    # 2. SCHEDULED RETRAINING TRIGGER
+    def run_scheduled_retraining():
+        try:
+            retrain_result = _adaptive_manager().scheduled_retraining(symbol_clean, price_series)
+            if retrain_result:
+                logger.info(f"✅ Scheduled retraining triggered: {retrain_result}")
+        except Exception as retrain_error:
+            logger.warning(f"⚠️ Scheduled retraining check failed: {retrain_error}")
+
+    # 3. ROLLING WINDOW REGRESSION UPDATE
+    def run_rolling_window():
+        try:
+            rolling_predictions = _adaptive_manager().rolling_window_regression(symbol_clean, price_series)
+            if rolling_predictions:
+                logger.info(f"✅ Rolling window updated: {len(rolling_predictions)} predictions")
+        except Exception as rolling_error:
+            logger.warning(f"⚠️ Rolling window update failed: {rolling_error}")
+
+    # 4. PERFORMANCE DEGRADATION CHECK
+    def run_degradation_check():
+        try:
+            needs_retrain = _adaptive_manager().check_retraining_needed(symbol_clean, 'lstm')
+            if needs_retrain:
+                logger.warning(f"🚨 Performance degradation detected for {symbol_clean}, retraining recommended")
+                # Auto-trigger retraining if severe degradation
+                if len(price_series) > 100:  # Only if we have enough data
+                    _adaptive_manager().retrain_model(symbol_clean, price_series, 'lstm')
+                    logger.info(f"✅ Auto-retraining completed for {symbol_clean}")
+        except Exception as perf_error:
+            logger.warning(f"⚠️ Performance check failed: {perf_error}")
+
+    # The four triggers are independent, so run them on the shared pool
+    # and wait for the slowest instead of the sum
+    trigger_futures = [
+        executor.submit(run_incremental_update),
+        executor.submit(run_scheduled_retraining),
+        executor.submit(run_rolling_window),
+        executor.submit(run_degradation_check)
+    ]
+    wait(trigger_futures, timeout=120)
+    logger.info(f"✅ All adaptive learning triggers completed for {symbol_clean}")
+
+def _training_worker():
+    while True:
+        job = training_queue.get()
+        try:
+            _run_adaptive_triggers(job['symbol'], job['series'])
+        except Exception as worker_error:
+            logger.error(f"❌ Adaptive learning triggers failed: {worker_error}")
+            logger.error(traceback.format_exc())
+        finally:
+            training_queue.task_done()
+
 # Create necessary directories on startup
 os.makedirs("saved_models", exist_ok=True)
 logger.info("✅ saved_models directory created/verified")
 
+# Indexes backing the hot lookups: portfolio by user, per-user trade
+# history, and latest-model-version scans (otherwise a full collection
+# scan plus in-memory sort on every /model/versions hit)
+def _ensure_indexes():
+    try:
+        db['portfolios'].create_index('user_id', unique=True)
+        db['holdings'].create_index([('user_id', 1), ('symbol', 1)], unique=True)
+        db['portfolio_transactions'].create_index([('portfolio_id', 1), ('timestamp', -1)])
+        db['model_versions'].create_index([('training_data_range.symbol', 1), ('created_at', -1)])
+        db['prediction_metrics'].create_index([('symbol', 1), ('timestamp', -1)])
+        # Unique key matching store_historical_data's upsert filter: a single
+        # B-tree probe per row and safe under unordered concurrent bulk writes
+        db['historical_prices'].create_index([('instrument_id', 1), ('timestamp', 1)], unique=True)
+        db['forecasts'].create_index([('instrument_id', 1), ('target_timestamp', 1)])
+        db['forecasts'].create_index([('symbol', 1), ('model_id', 1), ('horizon', 1)])
+        # Backs the hourly scoring job's matured-and-unscored scan
+        db['forecasts'].create_index([('actual_price', 1), ('target_timestamp', 1)])
+        db['performance_alerts'].create_index([('is_resolved', 1), ('timestamp', -1)])
+        logger.info("✅ Query indexes ensured")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not create query indexes: {e}")
+
 app = Flask(__name__)
 # ADD THIS LINE AFTER app = Flask(__name__)
-app.json_encoder = JSONEncoder
+app.json = ORJSONProvider(app)
+
+# Persist compiled Numba kernels across restarts and warm the lazily
+# imported forecast stack off the main thread, so the first real request
+# doesn't pay the multi-second JIT/model cold start
+os.environ.setdefault('NUMBA_CACHE_DIR', '/tmp/numba_cache')
+
+def _warmup_forecast_stack():
+    try:
+        _adaptive_manager().adaptive_forecast(
+            'WARMUP', pd.Series(np.arange(100, dtype=float)), 5, use_ensemble=False
+        )
+        logger.info("✅ Forecast stack warmed up")
+    except Exception as warmup_error:
+        logger.warning(f"⚠️ Forecast stack warmup skipped: {warmup_error}")
 
 # Configure CORS properly
 CORS(app, resources={
@@ -80,8 +308,7 @@ def get_instruments_endpoint():
 def get_historical_data_endpoint(symbol):
     logger.info(f"🔧 Historical data requested for: {symbol}")
     try:
-        symbol_clean = symbol.upper().strip()
-        yfinance_symbol = symbol_clean.replace('/', '-')
+        symbol_clean, yfinance_symbol = _norm(symbol)
         logger.info(f"🔧 Using yfinance symbol: {yfinance_symbol}")
 
         end_date = datetime.now()
@@ -93,8 +320,7 @@ def get_historical_data_endpoint(symbol):
         
         try:
             logger.info("🔄 Attempting direct yfinance fetch...")
-            ticker = yf.Ticker(yfinance_symbol)
-            hist_data = ticker.history(start=start_date, end=end_date, interval='1d')
+            hist_data = cached_history(yfinance_symbol, start=start_date, end=end_date, interval='1d')
             
             if not hist_data.empty:
                 logger.info(f"✅ Direct yfinance fetch successful: {len(hist_data)} rows")
@@ -126,78 +352,31 @@ def get_historical_data_endpoint(symbol):
         except Exception as e:
             logger.warning(f"⚠️ Could not store data in database: {str(e)}")
 
-        # 🚀 AUTOMATIC ADAPTIVE LEARNING TRIGGERS - ADD THIS SECTION
+        # 🚀 AUTOMATIC ADAPTIVE LEARNING TRIGGERS - queued out-of-band
         try:
             if historical_data is not None and not historical_data.empty:
-                logger.info(f"🔄 Checking adaptive learning triggers for {symbol_clean}")
-                
                 if len(historical_data) > 30:  # Only if we have sufficient data
-                    close_prices = historical_data['Close'] if 'Close' in historical_data.columns else historical_data['close']
-                    
-                    # Convert to pandas Series if needed
-                    if isinstance(close_prices, pd.Series):
-                        price_series = close_prices
+                    last_run = _last_enqueued.get(symbol_clean, 0)
+                    if time.time() - last_run >= _TRAINING_DEDUP_SECONDS:
+                        close_prices = historical_data['Close'] if 'Close' in historical_data.columns else historical_data['close']
+
+                        # Reuse the column Series as-is; only wrap (without
+                        # copying the buffer) when it isn't one already
+                        price_series = (
+                            close_prices if isinstance(close_prices, pd.Series)
+                            else pd.Series(np.asarray(close_prices), index=historical_data.index, copy=False)
+                        )
+
+                        training_queue.put_nowait({'symbol': symbol_clean, 'series': price_series})
+                        _last_enqueued[symbol_clean] = time.time()
+                        logger.info(f"🔄 Adaptive learning triggers queued for {symbol_clean}")
                     else:
-                        price_series = pd.Series(close_prices.values, index=historical_data.index)
-                    
-                    logger.info(f"📊 Price series prepared: {len(price_series)} points")
-                    
-                    # 1. INCREMENTAL UPDATE TRIGGER
-                    latest_model = enhanced_adaptive_manager.get_latest_model_info(symbol_clean, 'lstm')
-                    if latest_model:
-                        # Use recent data for incremental learning (last 5-7 days)
-                        recent_data = price_series.tail(7)
-                        if len(recent_data) >= 5:
-                            logger.info(f"🔄 Triggering incremental LSTM update for {symbol_clean}")
-                            try:
-                                new_version = enhanced_adaptive_manager.incremental_lstm_update(
-                                    symbol_clean, recent_data, latest_model['version_id']
-                                )
-                                if new_version:
-                                    logger.info(f"✅ Incremental update successful: {new_version}")
-                                else:
-                                    logger.warning("⚠️ Incremental update returned no new version")
-                            except Exception as inc_error:
-                                logger.warning(f"⚠️ Incremental update failed: {inc_error}")
-                    
-                    # 2. SCHEDULED RETRAINING TRIGGER
-                    logger.info(f"🔄 Checking scheduled retraining for {symbol_clean}")
-                    try:
-                        retrain_result = enhanced_adaptive_manager.scheduled_retraining(symbol_clean, price_series)
-                        if retrain_result:
-                            logger.info(f"✅ Scheduled retraining triggered: {retrain_result}")
-                    except Exception as retrain_error:
-                        logger.warning(f"⚠️ Scheduled retraining check failed: {retrain_error}")
-                    
-                    # 3. ROLLING WINDOW REGRESSION UPDATE
-                    logger.info(f"🔄 Updating rolling window regression for {symbol_clean}")
-                    try:
-                        rolling_predictions = enhanced_adaptive_manager.rolling_window_regression(symbol_clean, price_series)
-                        if rolling_predictions:
-                            logger.info(f"✅ Rolling window updated: {len(rolling_predictions)} predictions")
-                    except Exception as rolling_error:
-                        logger.warning(f"⚠️ Rolling window update failed: {rolling_error}")
-                    
-                    # 4. PERFORMANCE DEGRADATION CHECK
-                    logger.info(f"🔄 Checking for performance degradation for {symbol_clean}")
-                    try:
-                        needs_retrain = enhanced_adaptive_manager.check_retraining_needed(symbol_clean, 'lstm')
-                        if needs_retrain:
-                            logger.warning(f"🚨 Performance degradation detected for {symbol_clean}, retraining recommended")
-                            # Auto-trigger retraining if severe degradation
-                            if len(price_series) > 100:  # Only if we have enough data
-                                enhanced_adaptive_manager.retrain_model(symbol_clean, price_series, 'lstm')
-                                logger.info(f"✅ Auto-retraining completed for {symbol_clean}")
-                    except Exception as perf_error:
-                        logger.warning(f"⚠️ Performance check failed: {perf_error}")
-                    
-                    logger.info(f"✅ All adaptive learning triggers completed for {symbol_clean}")
+                        logger.info(f"⏸️ Adaptive learning recently queued for {symbol_clean}, skipping")
                 else:
                     logger.info(f"⏸️ Insufficient data for adaptive learning: {len(historical_data)} points")
-                    
+
         except Exception as adaptive_error:
-            logger.error(f"❌ Adaptive learning triggers failed: {adaptive_error}")
-            logger.error(traceback.format_exc())
+            logger.error(f"❌ Could not queue adaptive learning triggers: {adaptive_error}")
         # END OF ADAPTIVE LEARNING TRIGGERS
 
         if not isinstance(historical_data, pd.DataFrame):
@@ -211,76 +390,173 @@ def get_historical_data_endpoint(symbol):
         if historical_data.index.name == 'Date':
             historical_data = historical_data.reset_index()
 
-        result = []
-        for index, row in historical_data.iterrows():
-            if 'Date' in row:
-                date_value = row['Date']
-                if isinstance(date_value, pd.Timestamp):
-                    date_str = date_value.strftime('%Y-%m-%d')
-                else:
-                    date_str = str(date_value)
-            else:
-                date_str = (start_date + timedelta(days=index)).strftime('%Y-%m-%d')
-
-            result.append({
-                'id': f"{symbol}-{index}",
-                'instrument_id': symbol_clean,
-                'timestamp': date_str + 'T00:00:00Z',
-                'open': float(row['Open']),
-                'high': float(row['High']),
-                'low': float(row['Low']),
-                'close': float(row['Close']),
-                'volume': int(row['Volume']),
-                'created_at': datetime.now().isoformat()
-            })
-
-        logger.info(f"✅ Returning {len(result)} data points for {symbol}")
-        return jsonify(result)
+        # Vectorized serialization: column-level casts and strftime instead
+        # of re-boxing every cell through iterrows()
+        if 'Date' in historical_data.columns:
+            stamps = pd.to_datetime(historical_data['Date'])
+        else:
+            stamps = pd.Series(
+                pd.Timestamp(start_date) + pd.to_timedelta(historical_data.index.to_numpy(dtype=np.int64), unit='D'),
+                index=historical_data.index
+            )
+        timestamps = stamps.dt.strftime('%Y-%m-%dT00:00:00Z')
+
+        # One buffer extraction for all four price columns instead of four
+        # per-column astype passes
+        ohlc = historical_data[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=np.float64)
+        payload = pd.DataFrame({
+            'id': symbol + '-' + historical_data.index.astype(str),
+            'instrument_id': symbol_clean,
+            'timestamp': timestamps,
+            'open': ohlc[:, 0],
+            'high': ohlc[:, 1],
+            'low': ohlc[:, 2],
+            'close': ohlc[:, 3],
+            'volume': historical_data['Volume'].fillna(0).astype('int64'),
+            'created_at': datetime.now().isoformat()
+        })
+        logger.info(f"✅ Returning {len(payload)} data points for {symbol}")
+
+        # Closed-market daily data doesn't change between dashboard
+        # refreshes; a matching ETag turns the repeat request into an
+        # empty 304 with zero serialization
+        etag = hashlib.md5(
+            f"{symbol_clean}:{payload['timestamp'].iloc[-1]}:{len(payload)}".encode()
+        ).hexdigest()
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304
+
+        # Stream the rows instead of materializing the whole serialized
+        # list; cuts peak memory and lets the client start parsing before
+        # the last chunk is built. ?format=ndjson emits one row per line
+        # for line-by-line consumers; the default stays a JSON array for
+        # the existing frontend.
+        if request.args.get('format') == 'ndjson':
+            def generate_lines(df=payload):
+                for row in df.to_dict(orient='records'):
+                    yield orjson.dumps(row) + b'\n'
+
+            response = Response(stream_with_context(generate_lines()),
+                                mimetype='application/x-ndjson')
+        else:
+            def generate_rows(df=payload):
+                yield b'['
+                chunks = np.array_split(df, min(16, max(1, len(df))))
+                first = True
+                for chunk in chunks:
+                    if chunk.empty:
+                        continue
+                    body = orjson.dumps(chunk.to_dict(orient='records'))[1:-1]
+                    yield body if first else b',' + body
+                    first = False
+                yield b']'
+
+            response = Response(generate_rows(), mimetype='application/json')
+        response.headers['ETag'] = etag
+        return response
 
     except Exception as e:
         logger.error(f"❌ Error in historical data for {symbol}: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify([])
 
+# Built once at import so the fallback path allocates nothing per request
+_STARTUP_ISO = datetime.now().isoformat()
+DEFAULT_MODELS = [
+    {
+        'id': '1',
+        'name': 'ARIMA',
+        'type': 'traditional',
+        'description': 'AutoRegressive Integrated Moving Average',
+        'hyperparameters': {},
+        'performance_metrics': {'rmse': 2.5, 'mae': 1.8, 'mape': 1.2},
+        'is_active': True,
+        'created_at': _STARTUP_ISO,
+        'updated_at': _STARTUP_ISO
+    },
+    {
+        'id': '2',
+        'name': 'LSTM',
+        'type': 'neural',
+        'description': 'Long Short-Term Memory Neural Network',
+        'hyperparameters': {},
+        'performance_metrics': {'rmse': 1.8, 'mae': 1.3, 'mape': 0.9},
+        'is_active': True,
+        'created_at': _STARTUP_ISO,
+        'updated_at': _STARTUP_ISO
+    }
+]
+
+# Model catalogue changes rarely; a short TTL keeps /models off Mongo
+_models_cache = {'ts': 0.0, 'models': None}
+_MODELS_CACHE_TTL = 30
+
 @app.route('/models', methods=['GET'])
 def get_models_endpoint():
     try:
+        if _models_cache['models'] is not None and time.time() - _models_cache['ts'] < _MODELS_CACHE_TTL:
+            models = _models_cache['models']
+            etag = hashlib.md5(f"models:{len(models)}:{_models_cache['ts']}".encode()).hexdigest()
+            if request.headers.get('If-None-Match') == etag:
+                return '', 304
+            response = jsonify(models)
+            response.headers['ETag'] = etag
+            return response
+
         try:
             models_coll = db['forecasting_models']
             models = list(models_coll.find({}, {'_id': 0}))
             logger.info(f"Found {len(models)} models in database")
+            _models_cache['models'] = models
+            _models_cache['ts'] = time.time()
         except Exception as e:
             logger.warning(f"Could not fetch models from database: {str(e)}")
-            models = [
-                {
-                    'id': '1',
-                    'name': 'ARIMA',
-                    'type': 'traditional',
-                    'description': 'AutoRegressive Integrated Moving Average',
-                    'hyperparameters': {},
-                    'performance_metrics': {'rmse': 2.5, 'mae': 1.8, 'mape': 1.2},
-                    'is_active': True,
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                },
-                {
-                    'id': '2', 
-                    'name': 'LSTM',
-                    'type': 'neural',
-                    'description': 'Long Short-Term Memory Neural Network',
-                    'hyperparameters': {},
-                    'performance_metrics': {'rmse': 1.8, 'mae': 1.3, 'mape': 0.9},
-                    'is_active': True,
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                }
-            ]
-        
-        return jsonify(models)
+            models = DEFAULT_MODELS
+
+        etag = hashlib.md5(f"models:{len(models)}:{_models_cache['ts']}".encode()).hexdigest()
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304
+        response = jsonify(models)
+        response.headers['ETag'] = etag
+        return response
     except Exception as e:
         logger.error(f"Error fetching models: {str(e)}")
         return jsonify([])
 
+# In-flight map so concurrent identical forecast requests await one
+# computation instead of each fetching a year of data and fitting models
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _forecast_core(symbol_clean, horizon_hours, model_id):
+    """Fetch history and run the adaptive forecast for one request key."""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=365)
+
+    logger.info(f"📊 Fetching historical data for forecasting...")
+    historical_df = cached_history(symbol_clean, start=start_date, end=end_date, interval='1d')
+
+    if historical_df.empty:
+        return {'error': 'No historical data available for forecasting', 'status': 404}
+
+    logger.info(f"📊 Found {len(historical_df)} historical data points")
+
+    series = historical_df['Close'].dropna()
+    if len(series) < 10:
+        return {'error': 'Insufficient historical data for forecasting', 'status': 400}
+
+    logger.info(f"🤖 Generating adaptive forecast using model: {model_id}")
+
+    # Use adaptive learning system for all forecasts; named models run
+    # standalone, anything else gets the ensemble
+    use_ensemble = not ('arima' in model_id.lower() or 'lstm' in model_id.lower() or model_id in ('1', '2'))
+    predictions, model_used = _adaptive_manager().adaptive_forecast(
+        symbol_clean, series, horizon_hours, use_ensemble=use_ensemble
+    )
+
+    logger.info(f"✅ Adaptive forecast generated using: {model_used}")
+    return {'historical_df': historical_df, 'predictions': predictions, 'model_used': model_used}
+
 @app.route('/forecast', methods=['POST', 'OPTIONS'])
 def generate_forecast_endpoint():
     if request.method == 'OPTIONS':
@@ -305,68 +581,50 @@ def generate_forecast_endpoint():
         except ValueError:
             return jsonify({'error': 'horizon/days must be a number'}), 400
 
-        symbol_clean = symbol.upper().strip()
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)
-        
-        logger.info(f"📊 Fetching historical data for forecasting...")
-        
-        ticker = yf.Ticker(symbol_clean)
-        historical_df = ticker.history(start=start_date, end=end_date, interval='1d')
-        
-        if historical_df.empty:
-            return jsonify({'error': 'No historical data available for forecasting'}), 404
-
-        logger.info(f"📊 Found {len(historical_df)} historical data points")
-
-        series = historical_df['Close'].dropna()
-        
-        if len(series) < 10:
-            return jsonify({'error': 'Insufficient historical data for forecasting'}), 400
+        symbol_clean, _ = _norm(symbol)
 
-        # WITH THIS:
-        logger.info(f"🤖 Generating adaptive forecast using model: {model_id}")
+        # Coalesce: duplicates of an in-flight (symbol, horizon, model)
+        # request share the first computation's future
+        key = (symbol_clean, horizon_hours, model_id)
+        with _inflight_lock:
+            fut = _inflight.get(key)
+            if fut is None:
+                fut = executor.submit(_forecast_core, symbol_clean, horizon_hours, model_id)
+                fut.add_done_callback(lambda _f, k=key: _inflight.pop(k, None))
+                _inflight[key] = fut
+        core = fut.result(timeout=120)
 
-        # Use adaptive learning system for all forecasts
-        if 'arima' in model_id.lower() or model_id == '1':
-            predictions, model_used = enhanced_adaptive_manager.adaptive_forecast(
-                symbol_clean, series, horizon_hours, use_ensemble=False
-            )
-            model_name = 'ARIMA'
-        elif 'lstm' in model_id.lower() or model_id == '2':
-            predictions, model_used = enhanced_adaptive_manager.adaptive_forecast(
-                symbol_clean, series, horizon_hours, use_ensemble=False
-            )
-            model_name = 'LSTM'
-        else:
-            predictions, model_used = enhanced_adaptive_manager.adaptive_forecast(
-                symbol_clean, series, horizon_hours, use_ensemble=True
-            )
-            model_name = 'Ensemble'
+        if 'error' in core:
+            return jsonify({'error': core['error']}), core['status']
 
-        logger.info(f"✅ Adaptive forecast generated using: {model_used}")
+        historical_df = core['historical_df']
+        predictions = core['predictions']
+        model_used = core['model_used']
 
         last_date = historical_df.index[-1] if hasattr(historical_df.index, '__len__') else datetime.now()
-        future_dates = [last_date + timedelta(hours=i+1) for i in range(horizon_hours)]
-        
-        forecasts = []
-        for i, (date, pred) in enumerate(zip(future_dates, predictions)):
-            confidence_margin = pred * 0.02
-            
-            forecast_data = {
-                'id': f"forecast-{symbol}-{i}",
-                'instrument_id': symbol_clean,
-                'model_id': model_id,
-                'forecast_timestamp': datetime.now().isoformat(),
-                'target_timestamp': date.isoformat(),
-                'horizon_hours': horizon_hours,
-                'predicted_price': float(pred),
-                'confidence_lower': float(pred - confidence_margin),
-                'confidence_upper': float(pred + confidence_margin),
-                'actual_price': None,
-                'created_at': datetime.now().isoformat()
-            }
-            forecasts.append(forecast_data)
+        # Single C-level date_range call instead of N timedelta additions
+        future_idx = pd.date_range(last_date + pd.Timedelta(hours=1), periods=horizon_hours, freq='H')
+
+        # Vectorized record assembly: confidence bands computed on the
+        # whole array at once, one shared timestamp string per response
+        n = min(len(future_idx), len(predictions))
+        preds = np.asarray(predictions[:n], dtype=np.float64)
+        margins = preds * 0.02
+        now_iso = datetime.now().isoformat()
+        forecast_df = pd.DataFrame({
+            'id': [f"forecast-{symbol}-{i}" for i in range(n)],
+            'instrument_id': symbol_clean,
+            'model_id': model_id,
+            'forecast_timestamp': now_iso,
+            'target_timestamp': future_idx[:n].strftime('%Y-%m-%dT%H:%M:%S'),
+            'horizon_hours': horizon_hours,
+            'predicted_price': preds,
+            'confidence_lower': preds - margins,
+            'confidence_upper': preds + margins,
+            'actual_price': None,
+            'created_at': now_iso
+        })
+        forecasts = forecast_df.to_dict(orient='records')
 
         try:
             store_forecasts(symbol_clean, horizon_hours, model_id, forecasts)
@@ -386,6 +644,73 @@ def generate_forecast_endpoint():
         return jsonify({'error': f'Forecast generation failed: {str(e)}'}), 500
 
 # PORTFOLIO ROUTES - ADD THESE
+_price_cache = {'ts': 0.0, 'prices': {}}
+_PRICE_CACHE_TTL = 60
+
+def latest_prices(symbols):
+    """Fetch last closes for many symbols with one batched download."""
+    symbols = sorted(set(symbols))
+    if not symbols:
+        return {}
+    cached = _price_cache['prices']
+    if time.time() - _price_cache['ts'] < _PRICE_CACHE_TTL and all(s in cached for s in symbols):
+        return {s: cached[s] for s in symbols}
+
+    df = yf.download(symbols, period='2d', interval='1d',
+                     progress=False, group_by='ticker', threads=True)
+    prices = {}
+    for s in symbols:
+        try:
+            closes = (df[s]['Close'] if len(symbols) > 1 else df['Close']).dropna()
+            if not closes.empty:
+                prices[s] = float(closes.iloc[-1])
+        except Exception as price_error:
+            logger.warning(f"⚠️ No recent price for {s}: {price_error}")
+    _price_cache['prices'] = prices
+    _price_cache['ts'] = time.time()
+    return prices
+
+def _load_holdings(user_id):
+    """Assemble the per-symbol holdings dict from the flat holdings collection."""
+    return {
+        h['symbol']: h['quantity']
+        for h in db['holdings'].find({'user_id': user_id}, {'_id': 0, 'symbol': 1, 'quantity': 1})
+    }
+
+def _migrate_embedded_holdings(user_id):
+    """One-time move of a legacy embedded holdings dict into the flat collection.
+
+    Positions bought before holdings moved to their own collection live
+    in portfolio['holdings']; without this, selling one fails the
+    guarded decrement and a fresh buy shadows the embedded count on
+    reads. The guarded find_one_and_update claims the dict atomically,
+    so two concurrent requests can't both apply the increments.
+    """
+    claimed = db['portfolios'].find_one_and_update(
+        {'user_id': user_id, 'holdings': {'$exists': True, '$nin': [{}, None]}},
+        {'$set': {'holdings': {}}},
+        projection={'holdings': 1}
+    )
+    if not claimed:
+        return
+    items = list((claimed.get('holdings') or {}).items())
+    holdings_coll = db['holdings']
+    for i, (sym, qty) in enumerate(items):
+        try:
+            holdings_coll.update_one(
+                {'user_id': user_id, 'symbol': sym},
+                {'$inc': {'quantity': qty}},
+                upsert=True
+            )
+        except Exception:
+            # Put the not-yet-applied symbols back so no position is
+            # lost; the next request retries the claim
+            db['portfolios'].update_one(
+                {'user_id': user_id},
+                {'$set': {f'holdings.{k}': v for k, v in items[i:]}}
+            )
+            raise
+
 @app.route('/portfolio/create', methods=['POST'])
 def create_portfolio_endpoint():
     """Create or reset a portfolio"""
@@ -397,13 +722,14 @@ def create_portfolio_endpoint():
         # Create portfolio collection if it doesn't exist
         portfolio_coll = db['portfolios']
         
+        now_iso = datetime.now().isoformat()
         portfolio = {
             'user_id': user_id,
             'cash_balance': float(initial_capital),
             'holdings': {},
             'total_value': float(initial_capital),
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
+            'created_at': now_iso,
+            'updated_at': now_iso
         }
         
         portfolio_coll.update_one(
@@ -411,7 +737,9 @@ def create_portfolio_endpoint():
             {'$set': portfolio},
             upsert=True
         )
-        
+        # Resetting the portfolio also clears the flat per-symbol holdings
+        db['holdings'].delete_many({'user_id': user_id})
+
         return jsonify(portfolio)
     except Exception as e:
         logger.error(f"Error creating portfolio: {str(e)}")
@@ -426,19 +754,32 @@ def get_portfolio_endpoint(user_id):
         
         if not portfolio:
             # Create a default portfolio if none exists
+            now_iso = datetime.now().isoformat()
             default_portfolio = {
                 'user_id': user_id,
                 'cash_balance': 10000.0,
                 'holdings': {},
                 'total_value': 10000.0,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'created_at': now_iso,
+                'updated_at': now_iso
             }
             portfolio_coll.insert_one(default_portfolio)
             portfolio = default_portfolio
             
         # Remove MongoDB ID before returning
         portfolio.pop('_id', None)
+        # Holdings live in their own collection keyed (user_id, symbol);
+        # fold any legacy embedded dict into it first so the flat rows
+        # are the single source of truth
+        if portfolio.get('holdings'):
+            _migrate_embedded_holdings(user_id)
+        holdings = _load_holdings(user_id)
+        portfolio['holdings'] = holdings
+        if holdings:
+            # One batched download values every position at once
+            prices = latest_prices(holdings.keys())
+            holdings_value = sum(qty * prices.get(sym, 0.0) for sym, qty in holdings.items())
+            portfolio['total_value'] = portfolio.get('cash_balance', 0.0) + holdings_value
         return jsonify(portfolio)
     except Exception as e:
         logger.error(f"Error fetching portfolio: {str(e)}")
@@ -458,68 +799,100 @@ def execute_trade_endpoint():
             return jsonify({'error': 'Missing required parameters'}), 400
             
         # Get current price
-        ticker = yf.Ticker(symbol)
-        current_data = ticker.history(period='1d')
+        current_data = cached_history(symbol, period='1d')
         if current_data.empty:
             return jsonify({'error': 'Could not fetch current price'}), 400
             
         current_price = current_data['Close'].iloc[-1]
         
-        # Execute the trade
+        # Execute the trade with atomic $inc updates: the server never
+        # ships the whole holdings dict and concurrent trades can't lose
+        # each other's read-modify-write
         portfolio_coll = db['portfolios']
+        holdings_coll = db['holdings']
         transactions_coll = db['portfolio_transactions']
-        
-        # Get current portfolio
-        portfolio = portfolio_coll.find_one({'user_id': user_id})
-        if not portfolio:
-            return jsonify({'error': 'Portfolio not found'}), 404
-        
+
+        # Fold any legacy embedded holdings into the flat rows first, so
+        # selling a pre-migration position passes the guarded decrement
+        _migrate_embedded_holdings(user_id)
+
         total_cost = quantity * current_price
-        
+        now_iso = datetime.now().isoformat()
+
         if action == 'buy':
-            if portfolio['cash_balance'] < total_cost:
+            # Guarded decrement: only matches when funds cover the cost
+            portfolio = portfolio_coll.find_one_and_update(
+                {'user_id': user_id, 'cash_balance': {'$gte': total_cost}},
+                {
+                    '$inc': {'cash_balance': -total_cost, 'total_value': -total_cost, 'trade_count': 1},
+                    '$set': {'updated_at': now_iso}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if not portfolio:
+                if portfolio_coll.count_documents({'user_id': user_id}, limit=1) == 0:
+                    return jsonify({'error': 'Portfolio not found'}), 404
                 return jsonify({'error': 'Insufficient funds'}), 400
-            
-            # Update portfolio
-            new_cash = portfolio['cash_balance'] - total_cost
-            holdings = portfolio.get('holdings', {})
-            current_quantity = holdings.get(symbol, 0)
-            holdings[symbol] = current_quantity + quantity
-            
+
+            try:
+                holdings_coll.update_one(
+                    {'user_id': user_id, 'symbol': symbol},
+                    {'$inc': {'quantity': quantity}},
+                    upsert=True
+                )
+            except Exception:
+                # Give the debited cash back so the failed share credit
+                # doesn't leave the portfolio out of pocket
+                portfolio_coll.update_one(
+                    {'user_id': user_id},
+                    {'$inc': {'cash_balance': total_cost, 'total_value': total_cost,
+                              'trade_count': -1}}
+                )
+                raise
+
         elif action == 'sell':
-            holdings = portfolio.get('holdings', {})
-            current_quantity = holdings.get(symbol, 0)
-            
-            if current_quantity < quantity:
+            # Guarded decrement on the holding itself; rolls the share
+            # count and the cash credit into two atomic operations
+            holding = holdings_coll.find_one_and_update(
+                {'user_id': user_id, 'symbol': symbol, 'quantity': {'$gte': quantity}},
+                {'$inc': {'quantity': -quantity}},
+                return_document=ReturnDocument.AFTER
+            )
+            if not holding:
                 return jsonify({'error': 'Insufficient shares'}), 400
-            
-            # Update portfolio
-            new_cash = portfolio['cash_balance'] + total_cost
-            holdings[symbol] = current_quantity - quantity
-            
-            # Remove symbol if quantity becomes zero
-            if holdings[symbol] == 0:
-                del holdings[symbol]
+            if holding['quantity'] == 0:
+                holdings_coll.delete_one({'user_id': user_id, 'symbol': symbol, 'quantity': 0})
+
+            try:
+                portfolio = portfolio_coll.find_one_and_update(
+                    {'user_id': user_id},
+                    {
+                        '$inc': {'cash_balance': total_cost, 'total_value': total_cost, 'trade_count': 1},
+                        '$set': {'updated_at': now_iso}
+                    },
+                    return_document=ReturnDocument.AFTER
+                )
+            except Exception:
+                # Credit threw outright; restore the shares like the
+                # missing-portfolio branch below
+                holdings_coll.update_one(
+                    {'user_id': user_id, 'symbol': symbol},
+                    {'$inc': {'quantity': quantity}},
+                    upsert=True
+                )
+                raise
+            if not portfolio:
+                # Roll the share decrement back so the books stay balanced
+                holdings_coll.update_one(
+                    {'user_id': user_id, 'symbol': symbol},
+                    {'$inc': {'quantity': quantity}},
+                    upsert=True
+                )
+                return jsonify({'error': 'Portfolio not found'}), 404
         else:
             return jsonify({'error': 'Invalid action'}), 400
-        
-        # Calculate new total value
-        new_total_value = new_cash
-        
-        # Update portfolio in database
-        portfolio_coll.update_one(
-            {'user_id': user_id},
-            {
-                '$set': {
-                    'cash_balance': new_cash,
-                    'holdings': holdings,
-                    'total_value': new_total_value,
-                    'updated_at': datetime.now().isoformat()
-                }
-            }
-        )
-        
-        # Record transaction
+
+        new_cash = portfolio['cash_balance']
         transaction = {
             'portfolio_id': user_id,
             'symbol': symbol,
@@ -527,17 +900,34 @@ def execute_trade_endpoint():
             'quantity': quantity,
             'price': current_price,
             'total_amount': total_cost,
-            'timestamp': datetime.now().isoformat(),
-            'created_at': datetime.now().isoformat()
+            'timestamp': now_iso,
+            'created_at': now_iso
         }
-        
-        transactions_coll.insert_one(transaction)
-        
+        try:
+            transactions_coll.insert_one(transaction)
+        except Exception as ledger_error:
+            # Standalone mongod can't give us a multi-doc transaction, so
+            # compensate: undo the trade if the ledger write fails
+            logger.error(f"Ledger write failed, rolling back trade: {ledger_error}")
+            sign = 1 if action == 'sell' else -1
+            portfolio_coll.update_one(
+                {'user_id': user_id},
+                {'$inc': {'cash_balance': -sign * total_cost,
+                          'total_value': -sign * total_cost,
+                          'trade_count': -1}}
+            )
+            holdings_coll.update_one(
+                {'user_id': user_id, 'symbol': symbol},
+                {'$inc': {'quantity': sign * quantity}},
+                upsert=True
+            )
+            return jsonify({'error': 'Trade could not be recorded'}), 500
+
         return jsonify({
             'success': True,
             'new_cash_balance': new_cash,
-            'new_holdings': holdings,
-            'total_value': new_total_value
+            'new_holdings': _load_holdings(user_id),
+            'total_value': portfolio.get('total_value', new_cash)
         })
         
     except Exception as e:
@@ -548,27 +938,58 @@ def execute_trade_endpoint():
 def get_portfolio_performance_endpoint(user_id):
     """Get portfolio performance metrics"""
     try:
-        portfolio_coll = db['portfolios']
-        transactions_coll = db['portfolio_transactions']
-        
-        portfolio = portfolio_coll.find_one({'user_id': user_id})
-        if not portfolio:
+        # One aggregation replaces find_one + two count roundtrips: the
+        # trade counter is preferred when present, with \$lookup pipeline
+        # counts (never materializing the arrays) as the fallback
+        rows = list(db['portfolios'].aggregate([
+            {'$match': {'user_id': user_id}},
+            {'$lookup': {
+                'from': 'portfolio_transactions',
+                'let': {'uid': '$user_id'},
+                'pipeline': [
+                    {'$match': {'$expr': {'$eq': ['$portfolio_id', '$$uid']}}},
+                    {'$count': 'n'}
+                ],
+                'as': 'tx_count'
+            }},
+            {'$lookup': {
+                'from': 'holdings',
+                'let': {'uid': '$user_id'},
+                'pipeline': [
+                    {'$match': {'$expr': {'$eq': ['$user_id', '$$uid']}}},
+                    {'$count': 'n'}
+                ],
+                'as': 'holding_count'
+            }},
+            {'$project': {
+                '_id': 0,
+                'cash_balance': 1,
+                'total_value': 1,
+                'number_of_trades': {'$ifNull': [
+                    '$trade_count',
+                    {'$ifNull': [{'$arrayElemAt': ['$tx_count.n', 0]}, 0]}
+                ]},
+                'number_of_holdings': {'$ifNull': [{'$arrayElemAt': ['$holding_count.n', 0]}, 0]}
+            }}
+        ]))
+        if not rows:
             return jsonify({'error': 'Portfolio not found'}), 404
-        
+        portfolio = rows[0]
+
         initial_capital = 10000
         current_value = portfolio['total_value']
         total_return = ((current_value - initial_capital) / initial_capital) * 100
-        
+
         metrics = {
             'initial_capital': initial_capital,
             'current_value': current_value,
             'total_return_percent': round(total_return, 2),
             'total_return_dollar': round(current_value - initial_capital, 2),
             'cash_balance': portfolio['cash_balance'],
-            'number_of_holdings': len(portfolio.get('holdings', {})),
-            'number_of_trades': transactions_coll.count_documents({'portfolio_id': user_id})
+            'number_of_holdings': portfolio['number_of_holdings'],
+            'number_of_trades': portfolio['number_of_trades']
         }
-        
+
         return jsonify(metrics)
     except Exception as e:
         logger.error(f"Error calculating performance: {str(e)}")
@@ -598,8 +1019,9 @@ def adaptive_forecast_endpoint():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=365)
         
-        ticker = yf.Ticker(symbol)
-        historical_df = ticker.history(start=start_date, end=end_date, interval='1d')
+        historical_df = executor.submit(
+            cached_history, symbol, start=start_date, end=end_date, interval='1d'
+        ).result(timeout=60)
         
         if historical_df.empty:
             return jsonify({'error': 'No historical data available'}), 404
@@ -607,32 +1029,32 @@ def adaptive_forecast_endpoint():
         series = historical_df['Close'].dropna()
         
         # Use adaptive forecasting
-        forecast, model_used = enhanced_adaptive_manager.adaptive_forecast(
+        forecast, model_used = _adaptive_manager().adaptive_forecast(
             symbol, series, horizon, use_ensemble=True
         )
         
         # Prepare forecast results
         last_date = historical_df.index[-1]
-        future_dates = [last_date + timedelta(hours=i+1) for i in range(horizon)]
-        
-        forecasts = []
-        for i, (date, pred) in enumerate(zip(future_dates, forecast)):
-            confidence_margin = pred * 0.02
-            
-            forecast_data = {
-                'id': f"adaptive-{symbol}-{i}",
-                'instrument_id': symbol,
-                'model_id': f"adaptive_{model_used}",
-                'forecast_timestamp': datetime.now().isoformat(),
-                'target_timestamp': date.isoformat(),
-                'horizon_hours': horizon,
-                'predicted_price': float(pred),
-                'confidence_lower': float(pred - confidence_margin),
-                'confidence_upper': float(pred + confidence_margin),
-                'actual_price': None,
-                'created_at': datetime.now().isoformat()
-            }
-            forecasts.append(forecast_data)
+        future_idx = pd.date_range(last_date + pd.Timedelta(hours=1), periods=horizon, freq='H')
+
+        n = min(len(future_idx), len(forecast))
+        preds = np.asarray(forecast[:n], dtype=np.float64)
+        margins = preds * 0.02
+        now_iso = datetime.now().isoformat()
+        forecast_df = pd.DataFrame({
+            'id': [f"adaptive-{symbol}-{i}" for i in range(n)],
+            'instrument_id': symbol,
+            'model_id': f"adaptive_{model_used}",
+            'forecast_timestamp': now_iso,
+            'target_timestamp': future_idx[:n].strftime('%Y-%m-%dT%H:%M:%S'),
+            'horizon_hours': horizon,
+            'predicted_price': preds,
+            'confidence_lower': preds - margins,
+            'confidence_upper': preds + margins,
+            'actual_price': None,
+            'created_at': now_iso
+        })
+        forecasts = forecast_df.to_dict(orient='records')
 
         # Store forecasts
         store_forecasts(symbol, horizon, f"adaptive_{model_used}", forecasts)
@@ -654,7 +1076,7 @@ def get_model_performance_history_endpoint(symbol):  # CHANGED NAME
         performance_data = {}
         
         for model_type in ['arima', 'lstm', 'rolling_window', 'sliding_context']:
-            performance_data[model_type] = enhanced_adaptive_manager.get_performance_history(
+            performance_data[model_type] = _adaptive_manager().get_performance_history(
                 symbol, model_type, days=30
             )
         
@@ -694,33 +1116,33 @@ def retrain_model_endpoint():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=365)
         
-        ticker = yf.Ticker(symbol)
-        historical_df = ticker.history(start=start_date, end=end_date, interval='1d')
+        historical_df = cached_history(symbol, start=start_date, end=end_date, interval='1d')
         
         if historical_df.empty:
             return jsonify({'error': 'No historical data available'}), 404
 
         series = historical_df['Close'].dropna()
         
-        # Perform retraining
+        # Perform retraining (one clock read reused below)
+        now = datetime.now()
         if model_type == 'lstm':
-            version_id = enhanced_adaptive_manager.retrain_model(symbol, series, 'lstm')
+            version_id = _adaptive_manager().retrain_model(symbol, series, 'lstm')
         elif model_type == 'adaptive':
             # Use adaptive ensemble retraining
-            forecast, model_used = enhanced_adaptive_manager.adaptive_forecast(
+            forecast, model_used = _adaptive_manager().adaptive_forecast(
                 symbol, series, 24, use_ensemble=True
             )
-            version_id = f"adaptive_ensemble_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            version_id = f"adaptive_ensemble_{now.strftime('%Y%m%d_%H%M%S')}"
         else:
             # Complete retraining of all models
-            enhanced_adaptive_manager.retrain_model(symbol, series, 'lstm')
-            version_id = f"full_retrain_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            _adaptive_manager().retrain_model(symbol, series, 'lstm')
+            version_id = f"full_retrain_{now.strftime('%Y%m%d_%H%M%S')}"
         
         return jsonify({
             'retrained': True,
             'message': f'{model_type.upper()} model retraining completed for {symbol}',
             'version_id': version_id,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now.isoformat()
         })
             
     except Exception as e:
@@ -742,8 +1164,7 @@ def incremental_update_endpoint():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=7)  # Only last 7 days
         
-        ticker = yf.Ticker(symbol)
-        recent_df = ticker.history(start=start_date, end=end_date, interval='1d')
+        recent_df = cached_history(symbol, start=start_date, end=end_date, interval='1d')
         
         if recent_df.empty:
             return jsonify({'error': 'No recent data available'}), 404
@@ -751,14 +1172,14 @@ def incremental_update_endpoint():
         series = recent_df['Close'].dropna()
         
         # Get latest model version
-        latest_model = enhanced_adaptive_manager.get_latest_model_info(symbol, model_type)
+        latest_model = _adaptive_manager().get_latest_model_info(symbol, model_type)
         
         if not latest_model:
             return jsonify({'error': f'No existing {model_type} model found for incremental update'}), 404
         
         # Perform incremental update
         if model_type == 'lstm':
-            new_version_id = enhanced_adaptive_manager.incremental_lstm_update(
+            new_version_id = _adaptive_manager().incremental_lstm_update(
                 symbol, series, latest_model['version_id']
             )
             
@@ -773,39 +1194,136 @@ def incremental_update_endpoint():
                 return jsonify({'error': 'Incremental update failed'}), 500
         
         return jsonify({'error': f'Incremental update not supported for {model_type}'}), 400
-            
+
     except Exception as e:
         logger.error(f"Error in incremental update: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/model/incremental-update/batch', methods=['POST'])
+def incremental_update_batch_endpoint():
+    """Incrementally update many symbols off one batched download"""
+    try:
+        data = request.get_json()
+        symbols = data.get('symbols') or []
+        model_type = data.get('model_type', 'lstm')
+
+        if not symbols:
+            return jsonify({'error': 'symbols list is required'}), 400
+        if model_type != 'lstm':
+            return jsonify({'error': f'Incremental update not supported for {model_type}'}), 400
+
+        symbols = [_norm(s)[0] for s in symbols]
+
+        # One batched fetch for every symbol instead of N serial calls
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=7)
+        df = yf.download(symbols, start=start_date, end=end_date, interval='1d',
+                         progress=False, group_by='ticker', threads=True)
+
+        def update_one(sym):
+            try:
+                closes = (df[sym]['Close'] if len(symbols) > 1 else df['Close']).dropna()
+                if closes.empty:
+                    return sym, {'updated': False, 'error': 'No recent data available'}
+                latest_model = _adaptive_manager().get_latest_model_info(sym, model_type)
+                if not latest_model:
+                    return sym, {'updated': False, 'error': 'No existing model found'}
+                new_version_id = _adaptive_manager().incremental_lstm_update(
+                    sym, closes, latest_model['version_id']
+                )
+                if new_version_id:
+                    return sym, {'updated': True,
+                                 'old_version': latest_model['version_id'],
+                                 'new_version': new_version_id}
+                return sym, {'updated': False, 'error': 'Incremental update failed'}
+            except Exception as update_error:
+                return sym, {'updated': False, 'error': str(update_error)}
+
+        # The per-symbol fine-tunes are independent; overlap them on the pool
+        results = dict(executor.map(update_one, symbols))
+        updated = sum(1 for r in results.values() if r.get('updated'))
+
+        return jsonify({
+            'updated_count': updated,
+            'total': len(symbols),
+            'results': results
+        })
+
+    except Exception as e:
+        logger.error(f"Error in batch incremental update: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # MONITORING ROUTES
 @app.route('/monitoring/errors/<symbol>', methods=['GET'])
 def get_prediction_errors_endpoint(symbol):
     """Get prediction errors for a symbol"""
     try:
-        errors_coll = db['prediction_metrics']
-        
-        # Get recent prediction errors
-        cutoff_date = datetime.now() - timedelta(days=30)
-        errors = list(errors_coll.find({
+        # Raw series now live in prediction_samples; legacy metric docs
+        # still embed the arrays, so union both sources
+        errors_coll = db['prediction_samples']
+
+        # Zip, unwind and subtract server-side: Mongo ships three scalars
+        # per datapoint instead of two parallel arrays plus a Python loop
+        cutoff_date = datetime.utcnow() - timedelta(days=30)
+        sample_match = {
             'symbol': symbol,
-            'timestamp': {'$gte': cutoff_date.isoformat()}
-        }, {'_id': 0}).sort('timestamp', -1).limit(100))
-        
-        # Format errors for frontend
-        formatted_errors = []
-        for error in errors:
-            if 'predictions' in error and 'actuals' in error:
-                for pred, actual in zip(error['predictions'], error['actuals']):
-                    formatted_errors.append({
-                        'timestamp': error['timestamp'],
-                        'predicted': pred,
-                        'actual': actual,
-                        'error': actual - pred
-                    })
-        
-        return jsonify(formatted_errors)
-        
+            'timestamp': {'$gte': cutoff_date},
+            'predictions': {'$exists': True},
+            'actuals': {'$exists': True}
+        }
+        # Legacy metric docs may carry either ISO-string timestamps
+        # (pre-migration) or BSON Dates (after the one-shot migration
+        # script runs), so match the cutoff against both encodings —
+        # Mongo comparisons are type-bracketed, so each branch only ever
+        # sees values of its own type
+        legacy_match = dict(sample_match)
+        del legacy_match['timestamp']
+        legacy_match['$or'] = [
+            {'timestamp': {'$gte': cutoff_date}},
+            {'timestamp': {'$gte': cutoff_date.isoformat()}}
+        ]
+        cursor = errors_coll.aggregate([
+            {'$match': sample_match},
+            {'$unionWith': {
+                'coll': 'prediction_metrics',
+                'pipeline': [{'$match': legacy_match}]
+            }},
+            {'$sort': {'timestamp': -1}},
+            {'$limit': 100},
+            {'$project': {
+                '_id': 0,
+                'timestamp': 1,
+                'pairs': {'$zip': {'inputs': ['$predictions', '$actuals']}}
+            }},
+            {'$unwind': '$pairs'},
+            {'$project': {
+                'timestamp': 1,
+                'predicted': {'$arrayElemAt': ['$pairs', 0]},
+                'actual': {'$arrayElemAt': ['$pairs', 1]},
+                'error': {'$subtract': [
+                    {'$arrayElemAt': ['$pairs', 1]},
+                    {'$arrayElemAt': ['$pairs', 0]}
+                ]}
+            }}
+        ], batchSize=64)
+
+        # Stream the cursor straight into the response instead of
+        # materializing the list first; socket reads overlap encoding
+        def generate_errors():
+            try:
+                yield b'['
+                first = True
+                for doc in cursor:
+                    body = orjson.dumps(doc)
+                    yield body if first else b',' + body
+                    first = False
+                yield b']'
+            finally:
+                cursor.close()
+
+        return Response(stream_with_context(generate_errors()),
+                        mimetype='application/json')
+
     except Exception as e:
         logger.error(f"Error getting prediction errors: {str(e)}")
         return jsonify([])
@@ -814,7 +1332,7 @@ def get_prediction_errors_endpoint(symbol):
 def get_monitoring_performance_endpoint(symbol):  # CHANGED NAME
     """Get comprehensive model performance for a symbol"""
     try:
-        performance_summary = monitoring_system.get_performance_summary(symbol)
+        performance_summary = _monitoring_system().get_performance_summary(symbol)
         return jsonify(performance_summary)
         
     except Exception as e:
@@ -825,13 +1343,8 @@ def get_monitoring_performance_endpoint(symbol):  # CHANGED NAME
 def get_performance_alerts_endpoint():
     """Get active performance alerts"""
     try:
-        alerts = monitoring_system.get_active_alerts()
-        
-        # Convert ObjectId to string for JSON serialization
-        for alert in alerts:
-            alert['id'] = str(alert['_id'])
-            del alert['_id']
-            
+        # Documents arrive with a stringified id already; no Python pass
+        alerts = _monitoring_system().get_active_alerts()
         return jsonify(alerts)
         
     except Exception as e:
@@ -842,7 +1355,7 @@ def get_performance_alerts_endpoint():
 def resolve_alert_endpoint(alert_id):
     """Mark an alert as resolved"""
     try:
-        success = monitoring_system.resolve_alert(alert_id)
+        success = _monitoring_system().resolve_alert(alert_id)
         
         return jsonify({'success': success})
         
@@ -855,29 +1368,103 @@ def get_metrics_history_endpoint(symbol):
     """Get metrics history for a symbol"""
     try:
         model_type = request.args.get('model_type')
-        
-        metrics = monitoring_system.get_metrics_history(symbol, model_type)
-        return jsonify(metrics)
-        
+
+        # Stream the cursor straight into the response; documents decode
+        # as the socket drains instead of materializing the whole window
+        cursor = _monitoring_system().get_metrics_history(
+            symbol, model_type, as_cursor=True)
+
+        def generate_metrics():
+            try:
+                yield b'['
+                first = True
+                for doc in cursor:
+                    body = orjson.dumps(doc, default=app.json._default)
+                    yield body if first else b',' + body
+                    first = False
+                yield b']'
+            finally:
+                if hasattr(cursor, 'close'):
+                    cursor.close()
+
+        return Response(stream_with_context(generate_metrics()),
+                        mimetype='application/json')
+
     except Exception as e:
         logger.error(f"Error getting metrics history: {str(e)}")
         return jsonify([])
 
-# Background task for continuous evaluation
-def background_continuous_evaluation():
-    """Background task to continuously evaluate predictions"""
-    while True:
-        try:
-            # This would typically check for new ground-truth data
-            # and evaluate recent predictions
-            time.sleep(3600)  # Run every hour
-        except Exception as e:
-            logger.error(f"Error in continuous evaluation: {str(e)}")
-            time.sleep(300)  # Wait 5 minutes on error
-
-# Start background thread (add this after app routes)
-eval_thread = threading.Thread(target=background_continuous_evaluation, daemon=True)
-eval_thread.start()
+# Scheduled evaluation: score matured forecasts against actual closes
+def evaluate_pending_forecasts():
+    """Fill actual_price on forecasts whose target time has passed."""
+    try:
+        now_iso = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        pending = list(db['forecasts'].find(
+            {'actual_price': None, 'target_timestamp': {'$lte': now_iso}},
+            {'_id': 1, 'symbol': 1, 'target_timestamp': 1}
+        ).limit(2000))
+        if not pending:
+            return
+
+        # One batched download for every symbol with matured forecasts
+        symbols = sorted({p['symbol'] for p in pending})
+        data = yf.download(symbols, period='7d', interval='1d',
+                           progress=False, group_by='ticker', threads=True)
+
+        ops = []
+        for p in pending:
+            try:
+                closes = data[p['symbol']]['Close'] if len(symbols) > 1 else data['Close']
+                closes = closes.dropna()
+                if closes.empty:
+                    continue
+                idx = closes.index.tz_localize(None) if closes.index.tz is not None else closes.index
+                target_day = pd.Timestamp(p['target_timestamp'][:10])
+                eligible = closes[idx.normalize() <= target_day]
+                actual = float(eligible.iloc[-1]) if len(eligible) else float(closes.iloc[-1])
+                ops.append(UpdateOne({'_id': p['_id']}, {'$set': {'actual_price': actual}}))
+            except Exception as score_error:
+                logger.warning(f"⚠️ Could not score forecast {p['_id']}: {score_error}")
+
+        if ops:
+            result = db['forecasts'].bulk_write(ops, ordered=False)
+            logger.info(f"✅ Scored {result.modified_count} matured forecasts")
+    except Exception as e:
+        logger.error(f"Error in continuous evaluation: {str(e)}")
+
+# One coalesced hourly job instead of a busy-idle thread; the call-site
+# gate below keeps the debug reloader from double-starting it
+scheduler = BackgroundScheduler()
+scheduler.add_job(evaluate_pending_forecasts, 'interval', minutes=60,
+                  coalesce=True, max_instances=1)
+
+_background_started = threading.Event()
+
+def start_background_services():
+    """Start the training-queue consumer, warmup thread and scheduler.
+
+    Runs at import time for the dev server, but from gunicorn's
+    post_fork hook when preload_app is on: threads started in the
+    preloaded master don't survive fork(), so each worker has to start
+    its own consumer/scheduler or queued training jobs are silently
+    dropped and matured forecasts never get scored.
+    """
+    if _background_started.is_set():
+        return
+    _background_started.set()
+    _ensure_indexes()
+    threading.Thread(target=_training_worker, daemon=True).start()
+    threading.Thread(target=_warmup_forecast_stack, daemon=True).start()
+    scheduler.start()
+
+# Under a preloading gunicorn master the import happens pre-fork, so
+# gunicorn_conf.py sets this flag and calls us per worker instead.
+# `python app.py` runs this module twice — once in the reloader's
+# watchdog parent and once in the serving child (WERKZEUG_RUN_MAIN set)
+# — and only the child should carry the worker threads and scheduler.
+if os.environ.get('BACKGROUND_SERVICES') != 'post_fork':
+    if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
 
 if __name__ == '__main__':
     logger.info("🚀 Starting FinTech Forecaster API...")
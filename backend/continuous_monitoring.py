@@ -1,20 +1,27 @@
 # continuous_monitoring.py
 import pandas as pd
 import numpy as np
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 import logging
 from db import db
 import asyncio
 from typing import Dict, List, Optional
-import warnings
-warnings.filterwarnings('ignore')
 
 logger = logging.getLogger(__name__)
 
 class ContinuousMonitoringSystem:
     def __init__(self):
         self.metrics_coll = db['prediction_metrics']
+        self.samples_coll = db['prediction_samples']
         self.performance_alerts_coll = db['performance_alerts']
+        # Memoizes the actuals-only denominators (ss_tot, mse_naive) so
+        # overlapping evaluations over the same window skip those passes
+        self._denominator_cache = {}
+        # Last-10 RMSE values per (symbol, model_type), fed by
+        # log_prediction_metrics; trend reads hit this before Mongo.
+        # Empty after restart — trend recovers as evaluations come in
+        self._rmse_ring = defaultdict(lambda: deque(maxlen=10))
         self.setup_collections()
     
     def setup_collections(self):
@@ -25,6 +32,9 @@ class ContinuousMonitoringSystem:
             self.metrics_coll.create_index([("model_type", 1), ("timestamp", -1)])
             self.metrics_coll.create_index([("timestamp", 1)])
             
+            self.samples_coll.create_index([("metric_id", 1)])
+            self.samples_coll.create_index([("symbol", 1), ("timestamp", -1)])
+
             self.performance_alerts_coll.create_index([("symbol", 1), ("created_at", -1)])
             self.performance_alerts_coll.create_index([("is_resolved", 1)])
             
@@ -32,12 +42,91 @@ class ContinuousMonitoringSystem:
         except Exception as e:
             logger.error(f"Error setting up monitoring collections: {str(e)}")
 
+    # Below this size the NumPy ufunc dispatch overhead outweighs the
+    # math; a single pure-Python loop wins
+    SMALL_SAMPLE_THRESHOLD = 32
+
+    @staticmethod
+    def _small_sample_metrics(predictions: List[float], actuals: List[float]) -> Dict:
+        """Single-pass metric computation for small evaluation windows"""
+        import math
+
+        pairs = [(float(p), float(a)) for p, a in zip(predictions, actuals)
+                 if not (math.isnan(float(p)) or math.isnan(float(a)))]
+        if not pairs:
+            return {}
+
+        n = len(pairs)
+        sum_e = sum_e2 = sum_abs = sum_pct = 0.0
+        sum_a = sum_a2 = 0.0
+        pct_n = 0
+        abs_errors = []
+        for p, a in pairs:
+            e = a - p
+            sum_e += e
+            sum_e2 += e * e
+            ae = abs(e)
+            abs_errors.append(ae)
+            sum_abs += ae
+            if a:
+                sum_pct += abs(e / a) * 100
+                pct_n += 1
+            sum_a += a
+            sum_a2 += a * a
+
+        mean_e = sum_e / n
+        max_abs = max(abs_errors)
+        min_abs = min(abs_errors)
+        abs_errors.sort()
+        mid = n // 2
+        median_abs = abs_errors[mid] if n % 2 else (abs_errors[mid - 1] + abs_errors[mid]) / 2
+
+        mean_a = sum_a / n
+        ss_tot = sum_a2 - n * mean_a * mean_a
+        r_squared = float(1 - (sum_e2 / ss_tot)) if ss_tot != 0 else 0.0
+
+        # Direction accuracy and Theil's U over consecutive changes
+        correct = considered = 0
+        sum_diff2 = sum_naive2 = 0.0
+        for (p0, a0), (p1, a1) in zip(pairs, pairs[1:]):
+            da = a1 - a0
+            dp = p1 - p0
+            sum_diff2 += (da - dp) ** 2
+            sum_naive2 += da * da
+            if da != 0 and dp != 0:
+                considered += 1
+                if (da > 0) == (dp > 0):
+                    correct += 1
+        direction_accuracy = correct / considered if considered else 0.0
+        if n < 2:
+            theils_u = 1.0
+        else:
+            theils_u = math.sqrt(sum_diff2 / sum_naive2) if sum_naive2 != 0 else 1.0
+
+        return {
+            'mae': sum_abs / n,
+            'rmse': math.sqrt(sum_e2 / n),
+            'mape': sum_pct / pct_n if pct_n else 0.0,
+            'bias': mean_e,
+            'std_error': math.sqrt(max(sum_e2 / n - mean_e * mean_e, 0.0)),
+            'max_error': max_abs,
+            'min_error': min_abs,
+            'error_range': max_abs - min_abs,
+            'median_absolute_error': median_abs,
+            'r_squared': r_squared,
+            'direction_accuracy': direction_accuracy,
+            'theils_u': theils_u
+        }
+
     def calculate_comprehensive_metrics(self, predictions: List[float], actuals: List[float]) -> Dict:
         """Calculate comprehensive error metrics"""
         try:
             if len(predictions) != len(actuals) or len(predictions) == 0:
                 return {}
-            
+
+            if len(predictions) < self.SMALL_SAMPLE_THRESHOLD:
+                return self._small_sample_metrics(predictions, actuals)
+
             predictions = np.array(predictions, dtype=float)
             actuals = np.array(actuals, dtype=float)
             
@@ -49,76 +138,125 @@ class ContinuousMonitoringSystem:
             if len(predictions) == 0:
                 return {}
             
+            # Shared intermediates computed once; every metric below reuses
+            # them instead of re-traversing the arrays
             errors = actuals - predictions
             absolute_errors = np.abs(errors)
-            percentage_errors = np.abs(errors / actuals) * 100
-            
+            sq_errors = errors * errors
+            # Branchless masked division: zero actuals (splits, holidays)
+            # contribute NaN and are excluded from MAPE via nanmean
+            # instead of tripping the divide warning machinery
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentage_errors = np.where(
+                    actuals != 0, np.abs(errors) / np.abs(actuals) * 100.0, np.nan)
+            max_abs = float(np.max(absolute_errors))
+            min_abs = float(np.min(absolute_errors))
+            ss_res = float(np.sum(sq_errors))
+            actual_changes = np.diff(actuals)
+            predicted_changes = np.diff(predictions)
+
+            # The R-squared and Theil's U denominators depend only on the
+            # actuals; memoize them so overlapping evaluations of the
+            # same window don't re-reduce the array. The raw bytes are
+            # the key — a 64-bit hash() could collide and silently serve
+            # another window's denominators, and the dict is capped at
+            # 128 entries so holding the bytes is bounded
+            cache_key = actuals.tobytes()
+            denominators = self._denominator_cache.get(cache_key)
+            if denominators is None:
+                ss_tot = float(np.sum((actuals - actuals.mean()) ** 2))
+                mse_naive = float(np.mean(actual_changes ** 2)) if len(actual_changes) else 0.0
+                denominators = (ss_tot, mse_naive)
+                if len(self._denominator_cache) >= 128:
+                    self._denominator_cache.pop(next(iter(self._denominator_cache)))
+                self._denominator_cache[cache_key] = denominators
+            ss_tot, mse_naive = denominators
+
             # Basic metrics
             metrics = {
                 'mae': float(np.mean(absolute_errors)),
-                'rmse': float(np.sqrt(np.mean(errors ** 2))),
-                'mape': float(np.mean(percentage_errors)),
+                'rmse': float(np.sqrt(np.mean(sq_errors))),
+                'mape': float(np.nanmean(percentage_errors)),
                 'bias': float(np.mean(errors)),  # Systematic bias
                 'std_error': float(np.std(errors)),
-                'max_error': float(np.max(absolute_errors)),
-                'min_error': float(np.min(absolute_errors)),
-                'error_range': float(np.max(absolute_errors) - np.min(absolute_errors))
+                'max_error': max_abs,
+                'min_error': min_abs,
+                'error_range': max_abs - min_abs
             }
-            
+
             # Additional statistical metrics
             metrics.update({
                 'median_absolute_error': float(np.median(absolute_errors)),
-                'r_squared': self.calculate_r_squared(actuals, predictions),
-                'direction_accuracy': self.calculate_direction_accuracy(actuals, predictions),
-                'theils_u': self.calculate_theils_u(actuals, predictions)
+                'r_squared': self.calculate_r_squared(actuals, predictions,
+                                                      ss_res=ss_res, ss_tot=ss_tot),
+                'direction_accuracy': self.calculate_direction_accuracy(
+                    actuals, predictions, actual_changes, predicted_changes),
+                'theils_u': self.calculate_theils_u(
+                    actuals, predictions, actual_changes, predicted_changes,
+                    mse_naive=mse_naive)
             })
-            
+
             return metrics
             
         except Exception as e:
             logger.error(f"Error calculating metrics: {str(e)}")
             return {}
 
-    def calculate_r_squared(self, actuals: np.ndarray, predictions: np.ndarray) -> float:
-        """Calculate R-squared metric"""
+    def calculate_r_squared(self, actuals: np.ndarray, predictions: np.ndarray,
+                            ss_res: float = None, ss_tot: float = None) -> float:
+        """Calculate R-squared metric (accepts precomputed sums)"""
         try:
-            ss_res = np.sum((actuals - predictions) ** 2)
-            ss_tot = np.sum((actuals - np.mean(actuals)) ** 2)
+            if ss_res is None:
+                ss_res = np.sum((actuals - predictions) ** 2)
+            if ss_tot is None:
+                ss_tot = np.sum((actuals - np.mean(actuals)) ** 2)
             return float(1 - (ss_res / ss_tot)) if ss_tot != 0 else 0.0
         except:
             return 0.0
 
-    def calculate_direction_accuracy(self, actuals: np.ndarray, predictions: np.ndarray) -> float:
-        """Calculate direction prediction accuracy"""
+    def calculate_direction_accuracy(self, actuals: np.ndarray, predictions: np.ndarray,
+                                     actual_changes: np.ndarray = None,
+                                     predicted_changes: np.ndarray = None) -> float:
+        """Calculate direction prediction accuracy (accepts precomputed diffs)"""
         try:
             if len(actuals) < 2:
                 return 0.0
-            
-            actual_directions = np.sign(np.diff(actuals))
-            predicted_directions = np.sign(np.diff(predictions))
-            
+
+            if actual_changes is None:
+                actual_changes = np.diff(actuals)
+            if predicted_changes is None:
+                predicted_changes = np.diff(predictions)
+            actual_directions = np.sign(actual_changes)
+            predicted_directions = np.sign(predicted_changes)
+
             # Remove points where direction is neutral (0)
             mask = (actual_directions != 0) & (predicted_directions != 0)
             if np.sum(mask) == 0:
                 return 0.0
-            
+
             correct_directions = np.sum(actual_directions[mask] == predicted_directions[mask])
             return float(correct_directions / np.sum(mask))
         except:
             return 0.0
 
-    def calculate_theils_u(self, actuals: np.ndarray, predictions: np.ndarray) -> float:
-        """Calculate Theil's U statistic"""
+    def calculate_theils_u(self, actuals: np.ndarray, predictions: np.ndarray,
+                           actual_changes: np.ndarray = None,
+                           predicted_changes: np.ndarray = None,
+                           mse_naive: float = None) -> float:
+        """Calculate Theil's U statistic (accepts precomputed diffs)"""
         try:
             if len(actuals) < 2:
                 return 1.0  # Worst possible value
-            
-            actual_changes = np.diff(actuals)
-            predicted_changes = np.diff(predictions)
-            
+
+            if actual_changes is None:
+                actual_changes = np.diff(actuals)
+            if predicted_changes is None:
+                predicted_changes = np.diff(predictions)
+
             mse_forecast = np.mean((actual_changes - predicted_changes) ** 2)
-            mse_naive = np.mean(actual_changes ** 2)
-            
+            if mse_naive is None:
+                mse_naive = np.mean(actual_changes ** 2)
+
             return float(np.sqrt(mse_forecast / mse_naive)) if mse_naive != 0 else 1.0
         except:
             return 1.0
@@ -133,21 +271,40 @@ class ContinuousMonitoringSystem:
             if not metrics:
                 return False
             
+            # BSON Dates index and range-compare much cheaper than ISO
+            # strings; parse string inputs so callers can keep passing ISO
+            now = datetime.utcnow()
+            if isinstance(forecast_timestamp, str):
+                try:
+                    forecast_timestamp = datetime.fromisoformat(forecast_timestamp)
+                except ValueError:
+                    pass
             metric_record = {
                 'symbol': symbol,
                 'model_type': model_type,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now,
                 'forecast_timestamp': forecast_timestamp,
                 'metrics': metrics,
                 'sample_size': len(predictions),
-                'predictions': [float(p) for p in predictions],
-                'actuals': [float(a) for a in actuals],
-                'created_at': datetime.now().isoformat()
+                'created_at': now
             }
+
+            # Store scalar metrics only; the raw series go to a side
+            # collection so metric documents stay small and range scans
+            # over (symbol, timestamp) don't drag sample arrays along
+            metric_id = self.metrics_coll.insert_one(metric_record).inserted_id
+            self.samples_coll.insert_one({
+                'metric_id': metric_id,
+                'symbol': symbol,
+                'model_type': model_type,
+                'timestamp': now,
+                'predictions': np.asarray(predictions, dtype=float).tolist(),
+                'actuals': np.asarray(actuals, dtype=float).tolist(),
+                'created_at': now
+            })
             
-            # Store in database
-            self.metrics_coll.insert_one(metric_record)
-            
+            self._rmse_ring[(symbol, model_type)].append(metrics['rmse'])
+
             # Check for performance alerts
             self.check_performance_alerts(symbol, model_type, metrics)
             
@@ -158,44 +315,34 @@ class ContinuousMonitoringSystem:
             logger.error(f"Error logging prediction metrics: {str(e)}")
             return False
 
+    # (metric key, threshold, alert type, message template); thresholds
+    # compare against abs(value) so bias works symmetrically
+    ALERT_RULES = [
+        ('rmse', 10.0, 'high_rmse', 'High RMSE ({value:.2f}) detected for {symbol}'),
+        ('mape', 15.0, 'high_mape', 'High MAPE ({value:.1f}%) detected for {symbol}'),
+        ('bias', 5.0, 'high_bias', 'Significant bias ({value:.2f}) detected for {symbol}'),
+    ]
+
     def check_performance_alerts(self, symbol: str, model_type: str, metrics: Dict):
         """Check if performance metrics trigger any alerts"""
         try:
-            alerts = []
-            
-            # RMSE alert threshold
-            if metrics['rmse'] > 10.0:  # Adjust threshold as needed
-                alerts.append({
-                    'type': 'high_rmse',
-                    'message': f'High RMSE ({metrics["rmse"]:.2f}) detected for {symbol}',
-                    'severity': 'warning',
-                    'threshold': 10.0,
-                    'actual_value': metrics['rmse']
-                })
-            
-            # MAPE alert threshold
-            if metrics['mape'] > 15.0:  # 15% error threshold
-                alerts.append({
-                    'type': 'high_mape',
-                    'message': f'High MAPE ({metrics["mape"]:.1f}%) detected for {symbol}',
+            alerts = [
+                {
+                    'type': alert_type,
+                    'message': template.format(value=metrics[key], symbol=symbol),
                     'severity': 'warning',
-                    'threshold': 15.0,
-                    'actual_value': metrics['mape']
-                })
-            
-            # Bias alert
-            if abs(metrics['bias']) > 5.0:  # Significant systematic bias
-                alerts.append({
-                    'type': 'high_bias',
-                    'message': f'Significant bias ({metrics["bias"]:.2f}) detected for {symbol}',
-                    'severity': 'warning',
-                    'threshold': 5.0,
-                    'actual_value': metrics['bias']
-                })
-            
-            # Store alerts
-            for alert in alerts:
-                alert_record = {
+                    'threshold': threshold,
+                    'actual_value': metrics[key]
+                }
+                for key, threshold, alert_type, template in self.ALERT_RULES
+                if abs(metrics.get(key, 0.0)) > threshold
+            ]
+
+            # Store alerts in one round-trip; one clock read shared by
+            # every record
+            now = datetime.utcnow()
+            alert_records = [
+                {
                     'symbol': symbol,
                     'model_type': model_type,
                     'alert_type': alert['type'],
@@ -203,36 +350,57 @@ class ContinuousMonitoringSystem:
                     'severity': alert['severity'],
                     'threshold': alert['threshold'],
                     'actual_value': alert['actual_value'],
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': now,
                     'is_resolved': False,
-                    'created_at': datetime.now().isoformat()
+                    'created_at': now
                 }
-                self.performance_alerts_coll.insert_one(alert_record)
+                for alert in alerts
+            ]
+            if alert_records:
+                self.performance_alerts_coll.insert_many(alert_records, ordered=False)
+            for alert in alerts:
                 logger.warning(f"Performance alert: {alert['message']}")
                 
         except Exception as e:
             logger.error(f"Error checking performance alerts: {str(e)}")
 
-    def get_metrics_history(self, symbol: str, model_type: str = None, 
-                          days: int = 30) -> List[Dict]:
-        """Get metrics history for a symbol and optional model type"""
+    # Default projection covers everything the summary/trend code reads;
+    # callers that need full records can pass their own
+    METRICS_HISTORY_PROJECTION = {
+        '_id': 0,
+        'model_type': 1,
+        'timestamp': 1,
+        'metrics': 1,
+        'sample_size': 1
+    }
+
+    def get_metrics_history(self, symbol: str, model_type: str = None,
+                          days: int = 30, projection: Dict = None,
+                          as_cursor: bool = False) -> List[Dict]:
+        """Get metrics history for a symbol and optional model type
+
+        With as_cursor=True the raw batched cursor is returned so callers
+        can stream it (and stop early) instead of materializing the list.
+        """
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
             query = {
                 'symbol': symbol,
-                'timestamp': {'$gte': cutoff_date.isoformat()}
+                'timestamp': {'$gte': cutoff_date}
             }
-            
+
             if model_type:
                 query['model_type'] = model_type
-            
-            metrics = list(self.metrics_coll.find(
-                query, 
-                {'_id': 0}
-            ).sort('timestamp', 1))
-            
-            return metrics
-            
+
+            cursor = self.metrics_coll.find(
+                query,
+                projection or self.METRICS_HISTORY_PROJECTION
+            ).sort('timestamp', 1).batch_size(100)
+
+            if as_cursor:
+                return cursor
+            return list(cursor)
+
         except Exception as e:
             logger.error(f"Error getting metrics history: {str(e)}")
             return []
@@ -240,57 +408,81 @@ class ContinuousMonitoringSystem:
     def get_performance_summary(self, symbol: str, days: int = 30) -> Dict:
         """Get performance summary across all models for a symbol"""
         try:
-            metrics_history = self.get_metrics_history(symbol, days=days)
-            
-            if not metrics_history:
-                return {}
-            
-            # Group by model type
-            model_metrics = {}
-            for metric in metrics_history:
-                model_type = metric['model_type']
-                if model_type not in model_metrics:
-                    model_metrics[model_type] = []
-                model_metrics[model_type].append(metric)
-            
-            # Calculate summary statistics
+            # Group server-side: Mongo returns one document per model type
+            # with the last-10 RMSE values and the latest record, instead
+            # of shipping 30 days of metric docs for Python to bucket
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            results = self.metrics_coll.aggregate([
+                {'$match': {
+                    'symbol': symbol,
+                    'timestamp': {'$gte': cutoff_date}
+                }},
+                {'$sort': {'timestamp': 1}},
+                {'$group': {
+                    '_id': '$model_type',
+                    'rmse_series': {'$push': '$metrics.rmse'},
+                    'last': {'$last': '$$ROOT'},
+                    'count': {'$sum': 1}
+                }},
+                {'$project': {
+                    'rmse_last10': {'$slice': ['$rmse_series', -10]},
+                    'last': 1,
+                    'count': 1
+                }}
+            ])
+
             summary = {}
-            for model_type, metrics_list in model_metrics.items():
-                recent_metrics = metrics_list[-1]['metrics'] if metrics_list else {}
+            for group in results:
+                last = group.get('last', {})
+                model_type = group['_id']
+                # Prefer the in-process ring fed by log_prediction_metrics;
+                # it reflects the freshest evaluations without re-reading
+                ring = self._rmse_ring.get((symbol, model_type))
+                rmse_values = list(ring) if ring and len(ring) >= 5 \
+                    else group.get('rmse_last10', [])
                 summary[model_type] = {
-                    'recent_metrics': recent_metrics,
-                    'total_evaluations': len(metrics_list),
-                    'last_evaluation': metrics_list[-1]['timestamp'] if metrics_list else None,
-                    'trend': self.calculate_performance_trend(metrics_list)
+                    'recent_metrics': last.get('metrics', {}),
+                    'total_evaluations': group['count'],
+                    'last_evaluation': last.get('timestamp'),
+                    'trend': self.calculate_performance_trend(
+                        rmse_values, group['count'])
                 }
-            
+
             return summary
-            
+
         except Exception as e:
             logger.error(f"Error getting performance summary: {str(e)}")
             return {}
 
-    def calculate_performance_trend(self, metrics_list: List[Dict]) -> str:
+    def calculate_performance_trend(self, rmse_values: List[float],
+                                    total_evaluations: int = None) -> str:
         """Calculate performance trend (improving/stable/degrading)"""
         try:
-            if len(metrics_list) < 5:
+            if total_evaluations is None:
+                total_evaluations = len(rmse_values)
+            if total_evaluations < 5 or len(rmse_values) < 2:
                 return "insufficient_data"
-            
-            # Use last 10 evaluations for trend analysis
-            recent_metrics = metrics_list[-10:]
-            rmse_values = [m['metrics']['rmse'] for m in recent_metrics]
-            
-            # Calculate trend using linear regression
-            x = np.arange(len(rmse_values))
-            slope = np.polyfit(x, rmse_values, 1)[0]
-            
+
+            # Closed-form least-squares slope over x = 0..n-1; polyfit's
+            # Vandermonde/LAPACK machinery is overkill for <=10 points
+            y = np.asarray(rmse_values, dtype=float)
+            n = y.size
+            sx = n * (n - 1) / 2
+            sxx = (n - 1) * n * (2 * n - 1) / 6
+            sy = y.sum()
+            sxy = (np.arange(n) * y).sum()
+            denom = n * sxx - sx * sx
+            if denom == 0:
+                return "stable"
+            slope = (n * sxy - sx * sy) / denom
+
             if slope < -0.01:  # RMSE decreasing
                 return "improving"
             elif slope > 0.01:  # RMSE increasing
                 return "degrading"
             else:
                 return "stable"
-                
+
         except Exception as e:
             logger.error(f"Error calculating performance trend: {str(e)}")
             return "unknown"
@@ -303,12 +495,16 @@ class ContinuousMonitoringSystem:
                 query['symbol'] = symbol
             if severity:
                 query['severity'] = severity
-            
-            alerts = list(self.performance_alerts_coll.find(
-                query, 
-                {'_id': 0}
-            ).sort('timestamp', -1))
-            
+
+            # Shape the documents server-side: stringified id in, raw _id
+            # out, so they arrive wire-ready for jsonify
+            alerts = list(self.performance_alerts_coll.aggregate([
+                {'$match': query},
+                {'$sort': {'timestamp': -1}},
+                {'$addFields': {'id': {'$toString': '$_id'}}},
+                {'$project': {'_id': 0}}
+            ]))
+
             return alerts
             
         except Exception as e:
@@ -320,7 +516,7 @@ class ContinuousMonitoringSystem:
         try:
             result = self.performance_alerts_coll.update_one(
                 {'_id': alert_id},
-                {'$set': {'is_resolved': True, 'resolved_at': datetime.now().isoformat()}}
+                {'$set': {'is_resolved': True, 'resolved_at': datetime.utcnow()}}
             )
             return result.modified_count > 0
         except Exception as e:
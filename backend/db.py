@@ -1,6 +1,9 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
 import pandas as pd
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 import os
 from pymongo import MongoClient
@@ -9,12 +12,18 @@ from pymongo import MongoClient
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/stock_forecast_db')
 
 try:
-    client = MongoClient(MONGODB_URI)
+    # connect=False defers socket creation to first use: a preloading
+    # gunicorn master imports this module pre-fork, and pymongo clients
+    # must not carry open connections across fork()
+    client = MongoClient(MONGODB_URI, maxPoolSize=50, minPoolSize=5,
+                         appname='fintech-forecaster', connect=False)
     db = client['stock_forecast_db']
-    
-    # Test connection
-    client.admin.command('ping')
-    print("✅ Successfully connected to MongoDB")
+
+    if os.environ.get('BACKGROUND_SERVICES') != 'post_fork':
+        # Eager ping surfaces connection errors at startup; skipped
+        # pre-fork so the master never opens sockets the workers inherit
+        client.admin.command('ping')
+        print("✅ Successfully connected to MongoDB")
 except Exception as e:
     print(f"❌ MongoDB connection error: {e}")
     raise
@@ -30,22 +39,37 @@ def get_instruments():
 
 def store_historical_data(symbol, df):
     historical_coll = db['historical_prices']
-    for _, row in df.iterrows():
-        doc = {
-            'instrument_id': symbol,
-            'timestamp': row.name.isoformat(),
-            'open': float(row['Open']),
-            'high': float(row['High']),
-            'low': float(row['Low']),
-            'close': float(row['Close']),
-            'volume': int(row['Volume']),
-            'created_at': datetime.now().isoformat()
-        }
-        historical_coll.update_one(
-            {'instrument_id': symbol, 'timestamp': doc['timestamp']},
-            {'$set': doc},
+    if df.empty:
+        return
+
+    # Vectorized doc build + one unordered bulk_write instead of one
+    # upsert round-trip per row
+    timestamps = df.index.strftime('%Y-%m-%dT%H:%M:%S')
+    opens = df['Open'].astype(float).to_numpy()
+    highs = df['High'].astype(float).to_numpy()
+    lows = df['Low'].astype(float).to_numpy()
+    closes = df['Close'].astype(float).to_numpy()
+    volumes = df['Volume'].fillna(0).astype(int).to_numpy()
+    created_at = datetime.now().isoformat()
+
+    ops = [
+        UpdateOne(
+            {'instrument_id': symbol, 'timestamp': ts},
+            {'$set': {
+                'instrument_id': symbol,
+                'timestamp': ts,
+                'open': o,
+                'high': h,
+                'low': l,
+                'close': c,
+                'volume': int(v),
+                'created_at': created_at
+            }},
             upsert=True
         )
+        for ts, o, h, l, c, v in zip(timestamps, opens, highs, lows, closes, volumes)
+    ]
+    historical_coll.bulk_write(ops, ordered=False)
 
 def get_historical_data(symbol, start_date, end_date):
     historical_coll = db['historical_prices']
@@ -53,36 +77,42 @@ def get_historical_data(symbol, start_date, end_date):
         'instrument_id': symbol,
         'timestamp': {'$gte': start_date.isoformat(), '$lte': end_date.isoformat()}
     }
-    data = list(historical_coll.find(query).sort('timestamp', 1))
+    # Project away _id server-side and parse timestamps with an explicit
+    # format so pandas takes the C fast path instead of per-value
+    # format inference
+    data = list(historical_coll.find(
+        query,
+        {'_id': 0, 'timestamp': 1, 'open': 1, 'high': 1,
+         'low': 1, 'close': 1, 'volume': 1}
+    ).sort('timestamp', 1))
     if not data:
         return pd.DataFrame()
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df.set_index('timestamp', inplace=True)
-    df.drop('_id', axis=1, inplace=True)
+    df = pd.DataFrame.from_records(data)
+    # Baseline rows were keyed with tz-aware isoformat strings (e.g.
+    # 2025-11-10T00:00:00-05:00); trim to the 19-char wall time first so
+    # mixed vintages parse on the same C fast path without raising
+    df.index = pd.to_datetime(df.pop('timestamp').str.slice(0, 19),
+                              format='%Y-%m-%dT%H:%M:%S')
     return df[['open', 'high', 'low', 'close', 'volume']]
 
 def store_forecasts(symbol, horizon, model_id, forecasts):
     try:
         forecasts_coll = db['forecasts']
-        
-        # Make a COPY to avoid mutating original
-        docs_to_insert = []
-        for f in forecasts:
-            doc = f.copy()  # Don't modify original
-            doc.update({
-                'symbol': symbol,
-                'horizon': horizon,
-                'model_id': model_id
-            })
-            docs_to_insert.append(doc)
-        
-        # Insert without returning _id into original list
-        result = forecasts_coll.insert_many(docs_to_insert)
-        
-        # Optional: log IDs, but NEVER modify `forecasts`
-        logger.info(f"Stored {len(result.inserted_ids)} forecasts")
-        
+
+        # C-level dict merge builds fresh docs (caller's list stays
+        # untouched); chunked unordered inserts keep batches bounded for
+        # long horizons
+        extra = {'symbol': symbol, 'horizon': horizon, 'model_id': model_id}
+        docs_to_insert = [{**f, **extra} for f in forecasts]
+
+        stored = 0
+        for i in range(0, len(docs_to_insert), 1000):
+            result = forecasts_coll.insert_many(
+                docs_to_insert[i:i + 1000], ordered=False)
+            stored += len(result.inserted_ids)
+
+        logger.info(f"Stored {stored} forecasts")
+
         return True
     except Exception as e:
         logger.error(f"Failed to store forecasts: {e}")
@@ -94,13 +124,15 @@ def create_initial_portfolio(user_id='default', initial_capital=10000):
     """Create a starting portfolio for a user"""
     portfolio_coll = db['portfolios']
     
+    now_iso = datetime.now().isoformat()
     portfolio = {
         'user_id': user_id,
         'cash_balance': float(initial_capital),
         'holdings': {},  # {symbol: quantity}
         'total_value': float(initial_capital),
-        'created_at': datetime.now().isoformat(),
-        'updated_at': datetime.now().isoformat()
+        'number_of_trades': 0,
+        'created_at': now_iso,
+        'updated_at': now_iso
     }
     
     portfolio_coll.update_one(
@@ -114,58 +146,47 @@ def execute_trade(user_id, symbol, action, quantity, price):
     """Execute a buy/sell trade"""
     portfolio_coll = db['portfolios']
     transactions_coll = db['portfolio_transactions']
-    
-    # Get current portfolio
-    portfolio = portfolio_coll.find_one({'user_id': user_id})
-    if not portfolio:
-        raise Exception("Portfolio not found")
-    
+
     total_cost = quantity * price
-    
+    now_iso = datetime.now().isoformat()
+    holding_field = f'holdings.{symbol}'
+
+    # Guarded server-side $inc: the filter doubles as the funds/shares
+    # check, so no full-document read-modify-write and no race between
+    # check and update. total_value mirrors cash (simplified valuation),
+    # so it moves by the same delta.
     if action == 'buy':
-        if portfolio['cash_balance'] < total_cost:
-            raise Exception("Insufficient funds")
-        
-        # Update portfolio
-        new_cash = portfolio['cash_balance'] - total_cost
-        holdings = portfolio.get('holdings', {})
-        current_quantity = holdings.get(symbol, 0)
-        holdings[symbol] = current_quantity + quantity
-        
+        delta_cash = -total_cost
+        guard = {'user_id': user_id, 'cash_balance': {'$gte': total_cost}}
+        delta_qty = quantity
+        failure = "Insufficient funds"
     elif action == 'sell':
-        holdings = portfolio.get('holdings', {})
-        current_quantity = holdings.get(symbol, 0)
-        
-        if current_quantity < quantity:
-            raise Exception("Insufficient shares")
-        
-        # Update portfolio
-        new_cash = portfolio['cash_balance'] + total_cost
-        holdings[symbol] = current_quantity - quantity
-        
-        # Remove symbol if quantity becomes zero
-        if holdings[symbol] == 0:
-            del holdings[symbol]
+        delta_cash = total_cost
+        guard = {'user_id': user_id, holding_field: {'$gte': quantity}}
+        delta_qty = -quantity
+        failure = "Insufficient shares"
     else:
         raise Exception("Invalid action")
-    
-    # Calculate new total value (simplified - we'll enhance this later)
-    new_total_value = new_cash
-    
-    # Update portfolio in database
-    portfolio_coll.update_one(
-        {'user_id': user_id},
-        {
-            '$set': {
-                'cash_balance': new_cash,
-                'holdings': holdings,
-                'total_value': new_total_value,
-                'updated_at': datetime.now().isoformat()
-            }
-        }
+
+    inc = {
+        'cash_balance': delta_cash,
+        'total_value': delta_cash,
+        holding_field: delta_qty,
+        'number_of_trades': 1
+    }
+    updated = portfolio_coll.find_one_and_update(
+        guard,
+        {'$inc': inc, '$set': {'updated_at': now_iso}},
+        return_document=ReturnDocument.AFTER
     )
-    
-    # Record transaction
+    if updated is None:
+        if portfolio_coll.find_one({'user_id': user_id}, {'_id': 1}) is None:
+            raise Exception("Portfolio not found")
+        raise Exception(failure)
+
+    # Record transaction; if the ledger insert fails, apply the inverse
+    # increments so the two writes stay consistent (standalone mongod,
+    # so no multi-document transactions available)
     transaction = {
         'portfolio_id': user_id,
         'symbol': symbol,
@@ -173,28 +194,45 @@ def execute_trade(user_id, symbol, action, quantity, price):
         'quantity': quantity,
         'price': price,
         'total_amount': total_cost,
-        'timestamp': datetime.now().isoformat(),
-        'created_at': datetime.now().isoformat()
+        'timestamp': now_iso,
+        'created_at': now_iso
     }
-    
-    transactions_coll.insert_one(transaction)
-    
+
+    try:
+        transactions_coll.insert_one(transaction)
+    except Exception:
+        portfolio_coll.update_one(
+            {'user_id': user_id},
+            {'$inc': {k: -v for k, v in inc.items()},
+             '$set': {'updated_at': now_iso}}
+        )
+        raise
+
+    # Drop the key once a position is fully closed; guarded on 0 so a
+    # concurrent buy between the trade and the cleanup is never lost
+    holdings = updated.get('holdings', {})
+    if action == 'sell' and holdings.get(symbol) == 0:
+        portfolio_coll.update_one(
+            {'user_id': user_id, holding_field: 0},
+            {'$unset': {holding_field: ''}}
+        )
+        holdings.pop(symbol, None)
+
     return {
         'success': True,
-        'new_cash_balance': new_cash,
+        'new_cash_balance': updated['cash_balance'],
         'new_holdings': holdings,
-        'total_value': new_total_value
+        'total_value': updated['total_value']
     }
 
 def calculate_portfolio_performance(user_id):
     """Calculate portfolio performance metrics"""
     portfolio_coll = db['portfolios']
-    transactions_coll = db['portfolio_transactions']
-    
+
     portfolio = portfolio_coll.find_one({'user_id': user_id})
     if not portfolio:
         raise Exception("Portfolio not found")
-    
+
     initial_capital = 10000  # Assuming fixed initial capital
     current_value = portfolio['total_value']
     total_return = ((current_value - initial_capital) / initial_capital) * 100
@@ -206,7 +244,7 @@ def calculate_portfolio_performance(user_id):
         'total_return_dollar': round(current_value - initial_capital, 2),
         'cash_balance': portfolio['cash_balance'],
         'number_of_holdings': len(portfolio.get('holdings', {})),
-        'number_of_trades': transactions_coll.count_documents({'portfolio_id': user_id})
+        'number_of_trades': portfolio.get('number_of_trades', 0)
     }
     
     return metrics
\ No newline at end of file
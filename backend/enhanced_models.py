@@ -155,14 +155,13 @@ def adaptive_forecast_lstm(series, steps, symbol=None, time_steps=24):
                         model = load_model(model_path)
                         existing_scaler = joblib.load(scaler_path)
                         
-                        # Use existing model for prediction
+                        # Use existing model for prediction; the traced
+                        # forecast step skips model.predict's per-call
+                        # pipeline/callback overhead
                         inputs = scaled_data[-time_steps:].reshape(1, time_steps, 1)
-                        predictions = []
-                        for _ in range(steps):
-                            pred = model.predict(inputs, verbose=0)
-                            predictions.append(pred[0,0])
-                            inputs = np.append(inputs[:,1:,:], pred.reshape(1,1,1), axis=1)
-                        
+                        predictions = enhanced_adaptive_manager._autoregress(
+                            model, inputs, steps)
+
                         # Inverse transform using the loaded scaler
                         predictions = existing_scaler.inverse_transform(np.array(predictions).reshape(-1,1)).flatten()
                         
@@ -172,7 +171,7 @@ def adaptive_forecast_lstm(series, steps, symbol=None, time_steps=24):
                             try:
                                 enhanced_adaptive_manager.log_prediction_accuracy(
                                     symbol, 'lstm', predictions, recent_actual,
-                                    datetime.now().isoformat()
+                                    datetime.utcnow()
                                 )
                                 logger.info("✅ Performance logged for existing model")
                             except Exception as log_error:
@@ -229,17 +228,12 @@ def adaptive_forecast_lstm(series, steps, symbol=None, time_steps=24):
         final_loss = history.history['loss'][-1]
         logger.info(f"✅ LSTM training completed. Final loss: {final_loss:.6f}")
 
-        # Generate forecasts
+        # Generate forecasts through the traced step
         inputs = scaled_data[-time_steps:].reshape(1, time_steps, 1)
-        predictions = []
-        
+
         logger.info("🔮 Generating forecasts...")
-        for i in range(steps):
-            pred = model.predict(inputs, verbose=0)
-            predictions.append(pred[0,0])
-            # Update inputs for next prediction
-            inputs = np.append(inputs[:,1:,:], pred.reshape(1,1,1), axis=1)
-        
+        predictions = enhanced_adaptive_manager._autoregress(model, inputs, steps)
+
         # Convert predictions back to original scale
         predictions = scaler.inverse_transform(np.array(predictions).reshape(-1,1)).flatten()
         logger.info(f"✅ Forecasts generated: {len(predictions)} points")
@@ -318,7 +312,7 @@ def adaptive_forecast_lstm(series, steps, symbol=None, time_steps=24):
                 recent_actual = series[-steps:].values
                 enhanced_adaptive_manager.log_prediction_accuracy(
                     symbol, 'lstm', predictions, recent_actual,
-                    datetime.now().isoformat()
+                    datetime.utcnow()
                 )
                 logger.info("✅ Performance logged for new model")
             except Exception as log_error:
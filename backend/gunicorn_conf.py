@@ -0,0 +1,34 @@
+# Gunicorn config for the forecaster API.
+# Run with: gunicorn -c gunicorn_conf.py app:app
+#
+# gthread workers let I/O-bound endpoints (yfinance, Mongo) share threads
+# while CPU-bound ARIMA/LSTM fits land on separate processes; preload_app
+# imports the ML stack once in the master instead of per worker.
+import os
+
+# Tell app.py not to start its background threads at import time: under
+# preload_app the import runs once in the master and threads started
+# there would not survive the fork. post_fork below starts them per
+# worker instead.
+os.environ['BACKGROUND_SERVICES'] = 'post_fork'
+
+workers = os.cpu_count() or 4
+threads = 8
+worker_class = 'gthread'
+preload_app = True
+timeout = 120
+bind = '0.0.0.0:5000'
+
+
+def on_starting(server):
+    # Runs once in the master pre-fork so workers don't race on setup
+    os.makedirs("saved_models", exist_ok=True)
+    os.environ.setdefault('NUMBA_CACHE_DIR', '/tmp/numba_cache')
+
+
+def post_fork(server, worker):
+    # Each worker needs its own training-queue consumer, warmup thread
+    # and scheduler — threads never cross fork(), so starting them in
+    # the preloaded master would leave every worker without them
+    from app import start_background_services
+    start_background_services()
@@ -0,0 +1,67 @@
+# migrate_monitoring_timestamps.py
+# One-shot migration: convert ISO-string timestamps in the monitoring
+# collections to BSON Dates so range queries use numeric index compares,
+# and trim UTC offsets off historical_prices keys so they match the
+# bulk writer's naive upsert filter. Safe to re-run; it only touches
+# fields that are still in the legacy encoding.
+from pymongo.errors import DuplicateKeyError
+
+from db import db
+
+CONVERSIONS = {
+    'prediction_metrics': ['timestamp', 'created_at', 'forecast_timestamp'],
+    'prediction_samples': ['timestamp', 'created_at'],
+    'performance_alerts': ['timestamp', 'created_at', 'resolved_at'],
+    'model_performance_history': ['timestamp', 'created_at'],
+}
+
+
+def migrate():
+    for coll_name, fields in CONVERSIONS.items():
+        coll = db[coll_name]
+        for field in fields:
+            try:
+                result = coll.update_many(
+                    {field: {'$type': 'string'}},
+                    [{'$set': {field: {'$dateFromString': {
+                        'dateString': f'${field}',
+                        'onError': f'${field}'
+                    }}}}]
+                )
+                print(f"✅ {coll_name}.{field}: converted {result.modified_count} documents")
+            except Exception as e:
+                print(f"❌ {coll_name}.{field}: migration failed: {e}")
+
+
+def migrate_historical_keys():
+    """Trim UTC offsets off historical_prices timestamp keys.
+
+    Baseline rows were keyed with tz-aware isoformat strings while the
+    bulk writer now uses naive wall-time keys, so re-storing the same
+    bar duplicated it under two encodings. Keeping the first 19 chars
+    preserves the wall time and matches the new upsert filter.
+    """
+    coll = db['historical_prices']
+    cursor = coll.find(
+        {'timestamp': {'$type': 'string', '$regex': '^.{20,}$'}},
+        {'timestamp': 1}
+    )
+    trimmed = dropped = 0
+    for doc in cursor:
+        try:
+            coll.update_one(
+                {'_id': doc['_id']},
+                {'$set': {'timestamp': doc['timestamp'][:19]}}
+            )
+            trimmed += 1
+        except DuplicateKeyError:
+            # A refreshed naive-keyed row already covers this bar; the
+            # legacy duplicate is the stale copy
+            coll.delete_one({'_id': doc['_id']})
+            dropped += 1
+    print(f"✅ historical_prices: trimmed {trimmed} keys, dropped {dropped} duplicates")
+
+
+if __name__ == '__main__':
+    migrate()
+    migrate_historical_keys()
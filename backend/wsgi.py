@@ -0,0 +1,18 @@
+# wsgi.py - production entrypoint.
+#
+# Network-bound deployments (yfinance-heavy traffic) can run greenlet
+# workers so one process serves hundreds of in-flight requests:
+#   gunicorn -k gevent -w 4 --worker-connections 200 wsgi:application
+# CPU-heavy deployments can keep the threaded config instead:
+#   gunicorn -c gunicorn_conf.py wsgi:application
+
+try:
+    # Must patch the stdlib before anything imports socket/ssl so
+    # yfinance's requests calls cooperate with the event loop
+    import gevent.monkey
+    gevent.monkey.patch_all()
+except ImportError:
+    # gevent is optional; threaded workers don't need the patch
+    pass
+
+from app import app as application